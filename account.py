@@ -1,45 +1,22 @@
+from datetime import datetime
+
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from extensions import db
-from models import User, Match, WalletTransaction, VIPProgress
+from extensions import db, commit_if_pending
+from models import User, Match, WalletTransaction, VIPProgress, UserStats
 from auth import login_required, get_current_user
 
 account_bp = Blueprint('account', __name__)
 
 
 def get_user_stats(user):
-    finished_status = Match.MATCH_STATUS["finished"]
-
-    total_matches = Match.query.filter(
-        ((Match.player1_id == user.id) | (Match.player2_id == user.id)),
-        Match.status_code == finished_status
-    ).count()
-
-    wins = Match.query.filter(
-        Match.winner_id == user.id,
-        Match.status_code == finished_status
-    ).count()
+    row = db.session.get(UserStats, user.id)
+    total_matches = row.total_matches if row else 0
+    wins = row.wins if row else 0
+    total_wagered = row.total_wagered if row else 0
+    total_won = row.total_won if row else 0
 
     losses = total_matches - wins
 
-    forfeits_given = Match.query.filter(
-        ((Match.player1_id == user.id) | (Match.player2_id == user.id)),
-        Match.status_code == finished_status,
-        Match.winner_id != user.id,
-        Match.winner_id.isnot(None),
-    ).count()
-
-    total_wagered_query = db.session.query(db.func.sum(Match.stake)).filter(
-        ((Match.player1_id == user.id) | (Match.player2_id == user.id)),
-        Match.status_code == finished_status
-    ).scalar()
-
-    total_wagered = total_wagered_query or 0
-
-    total_won = db.session.query(db.func.sum(Match.stake)).filter(
-        Match.winner_id == user.id,
-        Match.status_code == finished_status
-    ).scalar() or 0
-
     return {
         'total_matches': total_matches,
         'wins': wins,
@@ -56,38 +33,67 @@ def get_user_stats(user):
 def account_page():
     user = get_current_user()
     user.ensure_affiliate_code()
-    db.session.commit()
 
     stats = get_user_stats(user)
     vip = user.get_vip_progress()
-    db.session.commit()
-
-    referral_count = User.query.filter_by(referred_by_id=user.id).count()
+    commit_if_pending()
 
     return render_template(
         'account.html',
         user=user,
         stats=stats,
         vip=vip,
-        referral_count=referral_count
+        referral_count=user.referral_count
     )
 
 
+def _keyset_page(query, model, per_page):
+    """
+    Newest-first page keyed on (created_at, id) instead of OFFSET + COUNT.
+    Reads ?before=<iso>&before_id=<int> and returns (rows, next_cursor).
+    """
+    before_id = request.args.get('before_id', type=int)
+    try:
+        before = datetime.fromisoformat(request.args.get('before', ''))
+    except ValueError:
+        before = None
+
+    if before is not None and before_id is not None:
+        query = query.filter(db.or_(
+            model.created_at < before,
+            db.and_(model.created_at == before, model.id < before_id),
+        ))
+
+    rows = query.order_by(model.created_at.desc(), model.id.desc()) \
+        .limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        if last.created_at is not None:
+            next_cursor = {'before': last.created_at.isoformat(), 'before_id': last.id}
+
+    return rows, next_cursor
+
+
 @account_bp.route('/account/transactions')
 @login_required
 def transaction_history():
     user = get_current_user()
-    page = request.args.get('page', 1, type=int)
     per_page = 20
 
-    txns = WalletTransaction.query.filter_by(user_id=user.id) \
-        .order_by(WalletTransaction.created_at.desc()) \
-        .paginate(page=page, per_page=per_page, error_out=False)
+    txns, next_cursor = _keyset_page(
+        WalletTransaction.query.filter_by(user_id=user.id),
+        WalletTransaction,
+        per_page
+    )
 
     return render_template(
         'transaction_history.html',
         user=user,
-        txns=txns
+        txns=txns,
+        next_cursor=next_cursor
     )
 
 
@@ -95,21 +101,24 @@ def transaction_history():
 @login_required
 def game_history():
     user = get_current_user()
-    page = request.args.get('page', 1, type=int)
     per_page = 20
 
     finished_status = Match.MATCH_STATUS["finished"]
 
-    matches = Match.query.filter(
-        ((Match.player1_id == user.id) | (Match.player2_id == user.id)),
-        Match.status_code == finished_status
-    ).order_by(Match.created_at.desc()) \
-     .paginate(page=page, per_page=per_page, error_out=False)
+    matches, next_cursor = _keyset_page(
+        Match.query.filter(
+            ((Match.player1_id == user.id) | (Match.player2_id == user.id)),
+            Match.status_code == finished_status
+        ),
+        Match,
+        per_page
+    )
 
     return render_template(
         'game_history.html',
         user=user,
-        matches=matches
+        matches=matches,
+        next_cursor=next_cursor
     )
 
 
@@ -117,15 +126,14 @@ def game_history():
 @login_required
 def update_account():
     user = get_current_user()
-    email = request.form.get('email', '').strip()
+    email = request.form.get('email', '').strip().lower()
 
     if email:
-        existing = User.query.filter(
-            User.email == email,
-            User.id != user.id
-        ).first()
+        email_taken = db.session.query(
+            db.exists().where(db.func.lower(User.email) == email, User.id != user.id)
+        ).scalar()
 
-        if existing:
+        if email_taken:
             flash('Email already in use.', 'error')
             return redirect(url_for('account.account_page'))
 
@@ -1,13 +1,18 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from models import (db, User, AdminConfig, RakeTransaction, RakebackProgress,
                      Tournament, Match, get_lobby_rake_percent, get_tournament_rake_percent,
-                     get_tournament_payouts, JackpotPool, JackpotEntry,
+                     get_tournament_payouts, get_tournament_rake_matrix,
+                     get_tournament_payout_matrix, JackpotPool, JackpotEntry,
                      get_jackpot_rake_percent, get_jackpot_payouts, get_affiliate_tiers,
-                     Royal21Table)
+                     Royal21Table, credit_coins)
 from auth import login_required, get_current_user
+from extensions import commit_if_pending
 from datetime import datetime, timedelta
-from functools import wraps
+from functools import lru_cache, wraps
+from sqlalchemy.orm import load_only
 import json
+import re
+import time
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -24,35 +29,117 @@ def admin_required(f):
     return decorated
 
 
-@admin_bp.route('/')
-@admin_required
-def dashboard():
-    user = get_current_user()
-    total_users = User.query.count()
-    total_matches = Match.query.count()
-    total_tournaments = Tournament.query.count()
+# Dashboard aggregates are cached per process for a short TTL; inserting a
+# RakeTransaction bumps the version so this worker recomputes immediately.
+DASHBOARD_CACHE_TTL = 60
+_dashboard_cache = {'version': None, 'expires': 0.0, 'data': None}
+_rake_version = [0]
+
+
+@db.event.listens_for(RakeTransaction, 'after_insert')
+def _bump_rake_version(mapper, connection, target):
+    _rake_version[0] += 1
 
-    now = datetime.utcnow()
+
+def _minute_bucket():
+    return int(time.time() // 60)
+
+
+@lru_cache(maxsize=4)
+def _dashboard_windows(minute_bucket):
+    """(today_start, week_start, month_start) for the given UTC minute."""
+    now = datetime.utcfromtimestamp(minute_bucket * 60)
     today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
     week_start = today_start - timedelta(days=now.weekday())
     month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    return today_start, week_start, month_start
+
+
+RAKE_STATS_PERIODS = {
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+    '30d': timedelta(days=30),
+    '90d': timedelta(days=90),
+}
+
+
+@lru_cache(maxsize=16)
+def _rake_stats_start(period, minute_bucket):
+    # Minute-granular starts keep the created_at bind value stable across
+    # requests, so repeated rake-stats views reuse the same parameters.
+    if period == 'all':
+        return datetime(2020, 1, 1)
+    delta = RAKE_STATS_PERIODS.get(period, RAKE_STATS_PERIODS['7d'])
+    return datetime.utcfromtimestamp(minute_bucket * 60) - delta
+
+
+def _dashboard_aggregates():
+    now_mono = time.monotonic()
+    if (_dashboard_cache['data'] is not None
+            and _dashboard_cache['version'] == _rake_version[0]
+            and _dashboard_cache['expires'] > now_mono):
+        return _dashboard_cache['data']
+
+    version = _rake_version[0]
+    today_start, week_start, month_start = _dashboard_windows(_minute_bucket())
+
+    def rake_since(start):
+        return db.func.coalesce(db.func.sum(
+            db.case((RakeTransaction.created_at >= start, RakeTransaction.amount), else_=0)), 0)
+
+    # One range scan covers all three windows; the week can start before the month.
+    rake_today, rake_week, rake_month = db.session.query(
+        rake_since(today_start), rake_since(week_start), rake_since(month_start)
+    ).filter(RakeTransaction.created_at >= min(week_start, month_start)).one()
+
+    data = {
+        'total_users': User.query.count(),
+        'total_matches': Match.query.count(),
+        'total_tournaments': Tournament.query.count(),
+        'rake_today': rake_today,
+        'rake_week': rake_week,
+        'rake_month': rake_month,
+        'rake_total': db.session.query(db.func.coalesce(db.func.sum(RakeTransaction.amount), 0)).scalar(),
+    }
+    _dashboard_cache.update(version=version, expires=now_mono + DASHBOARD_CACHE_TTL, data=data)
+    return data
+
+
+# Columns the rake listing tables render; source_id is never shown.
+_RAKE_LISTING_COLUMNS = load_only(
+    RakeTransaction.source_type, RakeTransaction.amount, RakeTransaction.stake_amount,
+    RakeTransaction.rake_percent, RakeTransaction.created_at,
+)
+
+# Config forms post repeating rows as `<field>_<n>` (min_0, tier_name_2, ...).
+_INDEXED_FIELD = re.compile(r'^([a-z_]+?)_(\d+)$')
+
+
+def _indexed_form_rows(form, required):
+    """Group `<field>_<n>` form keys by n in a single pass over the form.
+
+    Returns ``(n, {field: value})`` pairs ordered by n, keeping only rows
+    that carry the ``required`` field.
+    """
+    rows = {}
+    for key, value in form.items():
+        m = _INDEXED_FIELD.match(key)
+        if m:
+            rows.setdefault(int(m.group(2)), {})[m.group(1)] = value
+    return [(i, rows[i]) for i in sorted(rows) if required in rows[i]]
 
-    rake_today = db.session.query(db.func.coalesce(db.func.sum(RakeTransaction.amount), 0))\
-        .filter(RakeTransaction.created_at >= today_start).scalar()
-    rake_week = db.session.query(db.func.coalesce(db.func.sum(RakeTransaction.amount), 0))\
-        .filter(RakeTransaction.created_at >= week_start).scalar()
-    rake_month = db.session.query(db.func.coalesce(db.func.sum(RakeTransaction.amount), 0))\
-        .filter(RakeTransaction.created_at >= month_start).scalar()
-    rake_total = db.session.query(db.func.coalesce(db.func.sum(RakeTransaction.amount), 0)).scalar()
 
-    recent_rake = RakeTransaction.query.order_by(RakeTransaction.created_at.desc()).limit(20).all()
+@admin_bp.route('/')
+@admin_required
+def dashboard():
+    user = get_current_user()
+    stats = _dashboard_aggregates()
+
+    recent_rake = RakeTransaction.query.options(_RAKE_LISTING_COLUMNS)\
+        .order_by(RakeTransaction.created_at.desc()).limit(20).all()
 
     return render_template('admin/dashboard.html', user=user,
-                           total_users=total_users, total_matches=total_matches,
-                           total_tournaments=total_tournaments,
-                           rake_today=rake_today, rake_week=rake_week,
-                           rake_month=rake_month, rake_total=rake_total,
-                           recent_rake=recent_rake)
+                           recent_rake=recent_rake, **stats)
 
 
 @admin_bp.route('/rake-stats')
@@ -61,19 +148,7 @@ def rake_stats():
     user = get_current_user()
     period = request.args.get('period', '7d')
 
-    now = datetime.utcnow()
-    if period == '24h':
-        start = now - timedelta(hours=24)
-    elif period == '7d':
-        start = now - timedelta(days=7)
-    elif period == '30d':
-        start = now - timedelta(days=30)
-    elif period == '90d':
-        start = now - timedelta(days=90)
-    elif period == 'all':
-        start = datetime(2020, 1, 1)
-    else:
-        start = now - timedelta(days=7)
+    start = _rake_stats_start(period, _minute_bucket())
 
     match_rake = db.session.query(db.func.coalesce(db.func.sum(RakeTransaction.amount), 0))\
         .filter(RakeTransaction.source_type == 'match', RakeTransaction.created_at >= start).scalar()
@@ -81,7 +156,8 @@ def rake_stats():
         .filter(RakeTransaction.source_type == 'tournament', RakeTransaction.created_at >= start).scalar()
     total_rake = match_rake + tournament_rake
 
-    transactions = RakeTransaction.query.filter(RakeTransaction.created_at >= start)\
+    transactions = RakeTransaction.query.options(_RAKE_LISTING_COLUMNS)\
+        .filter(RakeTransaction.created_at >= start)\
         .order_by(RakeTransaction.created_at.desc()).limit(50).all()
 
     return render_template('admin/rake_stats.html', user=user,
@@ -96,17 +172,15 @@ def lobby_rake():
     user = get_current_user()
     if request.method == 'POST':
         tiers = []
-        i = 0
-        while f'min_{i}' in request.form:
+        for _, row in _indexed_form_rows(request.form, 'min'):
             try:
                 tiers.append({
-                    'min': int(request.form.get(f'min_{i}', 0)),
-                    'max': int(request.form.get(f'max_{i}', 999999)),
-                    'percent': float(request.form.get(f'percent_{i}', 1)),
+                    'min': int(row.get('min', 0)),
+                    'max': int(row.get('max', 999999)),
+                    'percent': float(row.get('percent', 1)),
                 })
             except (ValueError, TypeError):
                 pass
-            i += 1
         if tiers:
             tiers.sort(key=lambda x: x['min'])
             AdminConfig.set('lobby_rake_tiers', tiers)
@@ -131,23 +205,26 @@ def tournament_rake():
     sizes = Tournament.PLAYER_SIZES
 
     if request.method == 'POST':
+        matrix = get_tournament_rake_matrix()
         for stake in stakes:
             for size in sizes:
                 key = f'rake_{stake}_{size}'
                 val = request.form.get(key)
                 if val is not None:
                     try:
-                        AdminConfig.set(f'tournament_rake_{stake}_{size}', float(val))
+                        matrix[f'{stake}_{size}'] = float(val)
                     except (ValueError, TypeError):
                         pass
+        AdminConfig.set('tournament_rake_matrix', matrix)
         db.session.commit()
         flash('Tournament rake settings updated.', 'success')
         return redirect(url_for('admin.tournament_rake'))
 
+    matrix = get_tournament_rake_matrix()
     current_rates = {}
     for stake in stakes:
         for size in sizes:
-            current_rates[f'{stake}_{size}'] = get_tournament_rake_percent(stake, size)
+            current_rates[f'{stake}_{size}'] = get_tournament_rake_percent(stake, size, matrix)
 
     return render_template('admin/tournament_rake.html', user=user,
                            stakes=stakes, sizes=sizes, current_rates=current_rates)
@@ -162,27 +239,31 @@ def tournament_payouts():
     if request.method == 'POST':
         size = int(request.form.get('size', 8))
         payouts = {}
-        i = 1
-        while f'place_{i}' in request.form:
+        for i, row in _indexed_form_rows(request.form, 'place'):
             try:
-                payouts[i] = float(request.form.get(f'place_{i}', 0))
+                payouts[i] = float(row['place'])
             except (ValueError, TypeError):
                 pass
-            i += 1
         if payouts:
-            AdminConfig.set(f'tournament_payouts_{size}', payouts)
+            matrix = get_tournament_payout_matrix()
+            matrix[str(size)] = payouts
+            AdminConfig.set('tournament_payout_matrix', matrix)
             db.session.commit()
             flash(f'Payouts for {size}-player tournaments updated.', 'success')
         return redirect(url_for('admin.tournament_payouts'))
 
+    matrix = get_tournament_payout_matrix()
     all_payouts = {}
     for size in sizes:
-        all_payouts[size] = get_tournament_payouts(size)
+        all_payouts[size] = get_tournament_payouts(size, matrix)
 
     return render_template('admin/tournament_payouts.html', user=user,
                            sizes=sizes, all_payouts=all_payouts)
 
 
+COINS_PAGE_SIZE = 50
+
+
 @admin_bp.route('/coins', methods=['GET', 'POST'])
 @admin_required
 def manage_coins():
@@ -218,8 +299,24 @@ def manage_coins():
         db.session.commit()
         return redirect(url_for('admin.manage_coins'))
 
-    users = User.query.order_by(User.username).all()
-    return render_template('admin/coins.html', user=user, users=users)
+    q = request.args.get('q', '').strip()
+    after = request.args.get('after', '').strip()
+
+    query = User.query
+    if q:
+        pattern = q.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        query = query.filter(db.func.lower(User.username).like(pattern, escape='\\'))
+    if after:
+        query = query.filter(User.username > after)
+
+    users = query.order_by(User.username).limit(COINS_PAGE_SIZE + 1).all()
+    next_after = None
+    if len(users) > COINS_PAGE_SIZE:
+        users = users[:COINS_PAGE_SIZE]
+        next_after = users[-1].username
+
+    return render_template('admin/coins.html', user=user, users=users,
+                           q=q, after=after, next_after=next_after)
 
 
 @admin_bp.route('/rakeback', methods=['GET', 'POST'])
@@ -237,17 +334,15 @@ def rakeback_config():
                 flash('Invalid number of days.', 'error')
         elif 'tier_name_0' in request.form:
             tiers = []
-            i = 0
-            while f'tier_name_{i}' in request.form:
+            for _, row in _indexed_form_rows(request.form, 'tier_name'):
                 try:
                     tiers.append({
-                        'name': request.form.get(f'tier_name_{i}', ''),
-                        'threshold': float(request.form.get(f'tier_threshold_{i}', 0)),
-                        'percent': float(request.form.get(f'tier_percent_{i}', 0)),
+                        'name': row['tier_name'],
+                        'threshold': float(row.get('tier_threshold', 0)),
+                        'percent': float(row.get('tier_percent', 0)),
                     })
                 except (ValueError, TypeError):
                     pass
-                i += 1
             if tiers:
                 tiers.sort(key=lambda x: x['threshold'])
                 AdminConfig.set('rakeback_tiers', tiers)
@@ -300,15 +395,13 @@ def jackpot_config():
 
         elif action == 'set_payouts':
             payouts = {}
-            i = 1
-            while f'place_{i}' in request.form:
+            for i, row in _indexed_form_rows(request.form, 'place'):
                 try:
-                    val = int(request.form.get(f'place_{i}', 0))
+                    val = int(row['place'])
                     if val > 0:
                         payouts[str(i)] = val
                 except (ValueError, TypeError):
                     pass
-                i += 1
             if payouts:
                 AdminConfig.set('jackpot_payouts', payouts)
                 db.session.commit()
@@ -321,23 +414,26 @@ def jackpot_config():
                 payouts_int = {int(k): v for k, v in payouts.items()}
 
                 from sqlalchemy import func as sqlfunc
+                # Joining users drops entries whose account no longer exists,
+                # so every row here is a payable winner.
                 top_entries = db.session.query(
-                    JackpotEntry.user_id,
+                    User.id,
                     sqlfunc.max(JackpotEntry.score).label('best_score'),
-                ).filter(JackpotEntry.jackpot_id == pool.id)\
-                 .group_by(JackpotEntry.user_id)\
+                ).join(JackpotEntry, JackpotEntry.user_id == User.id)\
+                 .filter(JackpotEntry.jackpot_id == pool.id)\
+                 .group_by(User.id)\
                  .order_by(sqlfunc.max(JackpotEntry.score).desc())\
                  .limit(max(payouts_int.keys()) if payouts_int else 4).all()
 
-                paid_out = 0
+                prizes = {}
                 for rank, entry in enumerate(top_entries, 1):
                     if rank in payouts_int:
                         prize = int(pool.pool_amount * payouts_int[rank] / 100)
                         if prize > 0:
-                            winner = User.query.get(entry.user_id)
-                            if winner:
-                                winner.coins += prize
-                                paid_out += prize
+                            prizes[entry.id] = prize
+
+                credit_coins(prizes)
+                paid_out = sum(prizes.values())
 
                 pool.status = 'paid'
                 pool.paid_out_at = datetime.utcnow()
@@ -371,7 +467,7 @@ def jackpot_config():
         return redirect(url_for('admin.jackpot_config', type=post_pool_type))
 
     pools = JackpotPool.get_all_active_pools()
-    db.session.commit()
+    commit_if_pending()
     jackpot_percent = get_jackpot_rake_percent()
     payouts = get_jackpot_payouts()
     payouts_int = {int(k): v for k, v in payouts.items()}
@@ -390,17 +486,15 @@ def affiliate_config():
     user = get_current_user()
     if request.method == 'POST':
         tiers = []
-        i = 0
-        while f'tier_name_{i}' in request.form:
+        for _, row in _indexed_form_rows(request.form, 'tier_name'):
             try:
                 tiers.append({
-                    'name': request.form.get(f'tier_name_{i}', ''),
-                    'threshold': float(request.form.get(f'tier_threshold_{i}', 0)),
-                    'percent': float(request.form.get(f'tier_percent_{i}', 0)),
+                    'name': row['tier_name'],
+                    'threshold': float(row.get('tier_threshold', 0)),
+                    'percent': float(row.get('tier_percent', 0)),
                 })
             except (ValueError, TypeError):
                 pass
-            i += 1
         if tiers:
             tiers.sort(key=lambda x: x['threshold'])
             AdminConfig.set('affiliate_tiers', tiers)
@@ -450,7 +544,7 @@ def royal21_create_table():
 @admin_bp.route('/api/royal21/open-table/<int:table_id>', methods=['POST'])
 @admin_required
 def royal21_open_table(table_id):
-    table = Royal21Table.query.get_or_404(table_id)
+    table = db.get_or_404(Royal21Table, table_id)
     table.is_open = True
     db.session.commit()
     flash(f'Table "{table.table_name}" opened.', 'success')
@@ -460,7 +554,7 @@ def royal21_open_table(table_id):
 @admin_bp.route('/api/royal21/close-table/<int:table_id>', methods=['POST'])
 @admin_required
 def royal21_close_table(table_id):
-    table = Royal21Table.query.get_or_404(table_id)
+    table = db.get_or_404(Royal21Table, table_id)
     table.is_open = False
     db.session.commit()
     flash(f'Table "{table.table_name}" closed.', 'success')
@@ -1,5 +1,5 @@
 from flask import Blueprint, render_template
-from extensions import db
+from extensions import db, commit_if_pending
 from models import (
     User,
     AffiliateCommission,
@@ -7,7 +7,8 @@ from models import (
     RakeTransaction,
     get_affiliate_tiers,
     get_affiliate_tier_for_rake,
-    get_affiliate_next_tier
+    get_affiliate_next_tier,
+    credit_coins,
 )
 from auth import login_required, get_current_user
 from sqlalchemy import func as sqlfunc
@@ -15,90 +16,91 @@ from sqlalchemy import func as sqlfunc
 affiliate_bp = Blueprint('affiliate', __name__)
 
 
-def get_total_referred_rake(user_id):
-    referred_ids = [
-        r.id for r in User.query.filter_by(referred_by_id=user_id).all()
-    ]
-
-    if not referred_ids:
-        return 0
+def _referred_seat_rake(user_id):
+    """Scalar subquery: full rake of every finished match seat held by a referral.
 
+    Each player is charged half of a match's rake, so callers halve this
+    once to get the referred rake.
+    """
+    referred_ids = db.select(User.id).where(User.referred_by_id == user_id)
     finished_status = Match.MATCH_STATUS["finished"]
 
-    total = 0
+    seat_rake = sqlfunc.sum(
+        db.case((Match.player1_id.in_(referred_ids), Match.rake_amount), else_=0)
+        + db.case((Match.player2_id.in_(referred_ids), Match.rake_amount), else_=0)
+    )
 
-    matches = Match.query.filter(
+    return db.select(sqlfunc.coalesce(seat_rake, 0)).where(
         Match.status_code == finished_status,
         Match.rake_amount > 0,
         db.or_(
             Match.player1_id.in_(referred_ids),
             Match.player2_id.in_(referred_ids),
         )
-    ).all()
+    ).scalar_subquery()
 
-    for m in matches:
-        player_rake = m.rake_amount / 2
 
-        if m.player1_id in referred_ids:
-            total += player_rake
+def get_total_referred_rake(user_id):
+    """Half of the rake from every finished match seat held by a referral."""
+    return int(db.session.query(_referred_seat_rake(user_id)).scalar()) // 2
 
-        if m.player2_id in referred_ids:
-            total += player_rake
 
-    return int(total)
+def _commissionable(match):
+    return bool(match.winner_id and match.stake > 0 and match.rake_amount and match.rake_amount > 0)
 
 
 def process_affiliate_commission(match):
-    if not match.winner_id or match.stake <= 0:
+    """Credit the referrers of both players for this match's rake."""
+    if not _commissionable(match):
         return
 
-    if not match.rake_amount or match.rake_amount <= 0:
-        return
-
-    player_rake = match.rake_amount / 2
-
-    for player_id in [match.player1_id, match.player2_id]:
-        if not player_id:
-            continue
+    player_ids = {pid for pid in (match.player1_id, match.player2_id) if pid}
+    # player id -> referrer id; referrers are credited in SQL, never loaded.
+    referrer_of = dict(
+        db.session.query(User.id, User.referred_by_id).filter(User.id.in_(player_ids))
+    )
+    already_paid = set(
+        db.session.query(
+            AffiliateCommission.referrer_id,
+            AffiliateCommission.referred_user_id,
+        ).filter(AffiliateCommission.source_match_id == match.id)
+    )
 
-        player = User.query.get(player_id)
+    # Coins are integers: each player's half of the rake, and the commission
+    # on it, are floored rather than carried as floats.
+    player_rake = match.rake_amount // 2
+    credits = {}
 
-        if not player or not player.referred_by_id:
+    for player_id in player_ids:
+        referrer_id = referrer_of.get(player_id)
+        if not referrer_id:
             continue
 
-        existing = AffiliateCommission.query.filter(
-            AffiliateCommission.referrer_id == player.referred_by_id,
-            AffiliateCommission.referred_user_id == player_id,
-            AffiliateCommission.source_match_id == match.id,
-        ).first()
-
-        if existing:
+        if (referrer_id, player_id) in already_paid:
             continue
 
-        total_rake = get_total_referred_rake(player.referred_by_id)
+        total_rake = get_total_referred_rake(referrer_id)
         tier = get_affiliate_tier_for_rake(total_rake)
         rate = tier['percent'] / 100.0
 
-        commission_amount = player_rake * rate
+        # Tier percents may have one or two decimals (e.g. 2.5), so work in
+        # basis points to stay in integer arithmetic.
+        commission_amount = player_rake * round(tier['percent'] * 100) // 10000
 
-        if commission_amount < 0.01:
+        if commission_amount <= 0:
             continue
 
-        commission = AffiliateCommission(
-            referrer_id=player.referred_by_id,
+        db.session.add(AffiliateCommission(
+            referrer_id=referrer_id,
             referred_user_id=player_id,
             source_match_id=match.id,
             amount=commission_amount,
             rate=rate,
             status_code=AffiliateCommission.STATUS["approved"],
-        )
-
-        db.session.add(commission)
-
-        referrer = User.query.get(player.referred_by_id)
+        ))
+        credits[referrer_id] = credits.get(referrer_id, 0) + commission_amount
 
-        if referrer:
-            referrer.coins += int(commission_amount)
+    credit_coins(credits)
 
 
 @affiliate_bp.route('/affiliate')
@@ -106,30 +108,48 @@ def process_affiliate_commission(match):
 def affiliate_page():
     user = get_current_user()
     user.ensure_affiliate_code()
-    db.session.commit()
+    commit_if_pending()
 
-    referrals = User.query.filter_by(
-        referred_by_id=user.id
+    # The template only renders a few fields, so fetch plain rows carrying
+    # those names instead of hydrating ORM objects (no lazy loads possible).
+    referrals = db.session.query(
+        User.id, User.username, User.created_at
+    ).filter(
+        User.referred_by_id == user.id
     ).order_by(User.created_at.desc()).all()
 
-    commissions = AffiliateCommission.query.filter(
+    commissions = db.session.query(
+        AffiliateCommission.created_at,
+        AffiliateCommission.amount,
+        AffiliateCommission.rate,
+        db.case(
+            AffiliateCommission.STATUS_LABEL,
+            value=AffiliateCommission.status_code,
+            else_='pending',
+        ).label('status'),
+    ).filter(
         AffiliateCommission.referrer_id == user.id
     ).order_by(
         AffiliateCommission.created_at.desc()
     ).limit(50).all()
 
-    total_earned = db.session.query(
+    earned = db.select(
         sqlfunc.coalesce(
             sqlfunc.sum(AffiliateCommission.amount),
             0
         )
-    ).filter(
+    ).where(
         AffiliateCommission.referrer_id == user.id,
         AffiliateCommission.status_code ==
         AffiliateCommission.STATUS["approved"]
-    ).scalar() or 0
-
-    total_referred_rake = get_total_referred_rake(user.id)
+    ).scalar_subquery()
+
+    # Both page aggregates in one round trip.
+    total_earned, referred_seat_rake = db.session.query(
+        earned, _referred_seat_rake(user.id)
+    ).one()
+    total_earned = total_earned or 0
+    total_referred_rake = int(referred_seat_rake) // 2
     current_tier = get_affiliate_tier_for_rake(total_referred_rake)
     next_tier = get_affiliate_next_tier(total_referred_rake)
     all_tiers = get_affiliate_tiers()
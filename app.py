@@ -4,7 +4,7 @@ from dotenv import load_dotenv
 
 from flask import Flask, request, abort
 from flask_socketio import SocketIO
-from extensions import db, login_manager
+from extensions import db, login_manager, normalize_database_url
 
 from auth import auth_bp, get_current_user
 from game import game_bp
@@ -15,17 +15,32 @@ from affiliate import affiliate_bp
 from admin import admin_bp
 from jackpot import jackpot_bp
 from royal21_bp import royal21_bp, init_socketio
-from migrate import run_migrations
+from migrate import init_database
+from match_timeouts import sweep_expired_matches, start_timeout_worker
 
 
-def _normalize_database_url(url: str) -> str:
+_NO_CACHE_HEADERS = {
+    "Cache-Control": "no-store, no-cache, must-revalidate, max-age=0",
+    "Pragma": "no-cache",
+    "Expires": "0",
+}
+_STATIC_MAX_AGE = 365 * 24 * 3600
+
+
+class _HealthCheck:
     """
-    Heroku-style DATABASE_URL historically used 'postgres://', which SQLAlchemy
-    expects as 'postgresql://'. Normalize if needed.
+    Answer GET /health at the WSGI layer: load balancer probes skip Flask
+    routing, the session cookie, Flask-Login and the after_request hooks.
     """
-    if url.startswith("postgres://"):
-        return "postgresql://" + url[len("postgres://") :]
-    return url
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        if environ.get("PATH_INFO") == "/health":
+            start_response("200 OK", [("Content-Type", "text/plain"), ("Content-Length", "2")])
+            return [b"ok"]
+        return self.wsgi_app(environ, start_response)
 
 
 def create_app() -> Flask:
@@ -48,15 +63,16 @@ def create_app() -> Flask:
     if not database_url:
         raise RuntimeError("DATABASE_URL is not set")
 
-    app.config["SQLALCHEMY_DATABASE_URI"] = _normalize_database_url(database_url)
+    app.config["SQLALCHEMY_DATABASE_URI"] = normalize_database_url(database_url)
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
         "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", "280")),
         "pool_pre_ping": True,
     }
 
-    # Disable static caching (helpful for rapid iteration)
-    app.config["SEND_FILE_MAX_AGE_DEFAULT"] = 0
+    # Game state is serialized on every poll. Dict insertion order is
+    # already stable (so ETags are too); skip the per-response key sort.
+    app.json.sort_keys = False
 
     # ---------------------------------------------------
     # INIT EXTENSIONS
@@ -71,7 +87,7 @@ def create_app() -> Flask:
     @login_manager.user_loader
     def load_user(user_id):
         try:
-            return User.query.get(int(user_id))
+            return db.session.get(User, int(user_id))
         except Exception:
             return None
 
@@ -90,25 +106,18 @@ def create_app() -> Flask:
 
     # ---------------------------------------------------
     # DB INIT + AUTO PROMOTE ADMIN
+    #
+    # Schema work runs once per deploy from the release step
+    # (`python migrate.py`). Set RUN_DB_INIT=1 to also do it at boot,
+    # e.g. for a local single-process run.
     # ---------------------------------------------------
-    with app.app_context():
-        try:
-            db.create_all()
-            run_migrations()
-
-            # Promote admin user
-            user = User.query.filter(
-                db.func.lower(User.username) == "iamearth"
-            ).first()
-
-            if user and not user.is_admin:
-                user.is_admin = True
-                db.session.commit()
-                app.logger.warning("IAMEARTH promoted to admin.")
-
-        except Exception as e:
-            # Don't crash boot if you prefer resilience; if you want strict boot, re-raise.
-            app.logger.exception("Startup error during db init: %s", e)
+    if os.environ.get("RUN_DB_INIT") == "1":
+        with app.app_context():
+            try:
+                init_database()
+            except Exception as e:
+                # Don't crash boot if you prefer resilience; if you want strict boot, re-raise.
+                app.logger.exception("Startup error during db init: %s", e)
 
     # ---------------------------------------------------
     # ROOT ENTRY
@@ -118,11 +127,9 @@ def create_app() -> Flask:
         return "OK", 200
 
     # ---------------------------------------------------
-    # HEALTH CHECK
+    # HEALTH CHECK (answered before Flask sees the request)
     # ---------------------------------------------------
-    @app.route("/health")
-    def health_check():
-        return "ok", 200
+    app.wsgi_app = _HealthCheck(app.wsgi_app)
 
     # ---------------------------------------------------
     # CRON CLEANUP ENDPOINT
@@ -131,6 +138,8 @@ def create_app() -> Flask:
     # - Do NOT run commit-at-end logic based on check_timeout() loops.
     # - apply_timeout() is designed to be idempotent and safe to call repeatedly.
     # - We use a loop guard to prevent infinite loops if a phase handler misbehaves.
+    # - The background timeout worker runs the same sweep on its own;
+    #   this endpoint forces a sweep now (cron fallback / manual trigger).
     # ---------------------------------------------------
     @app.route("/internal/cleanup")
     def internal_cleanup():
@@ -140,43 +149,20 @@ def create_app() -> Flask:
         if not cron_secret or provided != cron_secret:
             abort(403)
 
-        from models import Match
-        from engine import apply_timeout  # apply_timeout already checks timer internally
-
-        active_matches = Match.query.filter(Match.status == "active").all()
-
-        any_changed = False
-        for match in active_matches:
-            loop_guard = 0
-
-            # Keep applying timeouts as long as state advances.
-            # This allows chained transitions (e.g., ROUND_RESULT -> WAITING_BETS).
-            while True:
-                changed = apply_timeout(match)
-                if not changed:
-                    break
-
-                any_changed = True
-                loop_guard += 1
-                if loop_guard > 50:
-                    app.logger.error(
-                        "Timeout loop guard hit for match_id=%s phase=%s",
-                        getattr(match, "id", None),
-                        getattr(getattr(match, "match_state", None), "phase", None),
-                    )
-                    break
-
-        # Commit once per cleanup run (avoid extra churn).
-        if any_changed:
-            try:
-                db.session.commit()
-            except Exception:
-                db.session.rollback()
-                app.logger.exception("Cleanup commit failed; rolled back.")
-                abort(500)
+        try:
+            sweep_expired_matches()
+        except Exception:
+            db.session.rollback()
+            app.logger.exception("Cleanup commit failed; rolled back.")
+            abort(500)
 
         return "cleanup complete", 200
 
+    # ---------------------------------------------------
+    # BACKGROUND TIMEOUT WORKER
+    # ---------------------------------------------------
+    start_timeout_worker(app)
+
     # ---------------------------------------------------
     # TEMPLATE CONTEXT
     # ---------------------------------------------------
@@ -185,15 +171,46 @@ def create_app() -> Flask:
         return dict(get_current_user=get_current_user)
 
     # ---------------------------------------------------
-    # DISABLE CACHING
+    # STATIC CACHE BUSTING
+    # ---------------------------------------------------
+    @app.url_defaults
+    def static_version(endpoint, values):
+        # url_for('static', ...) gets ?v=<mtime>: a deploy that changes a file
+        # changes its URL, which is what makes the immutable caching below safe.
+        if endpoint == "static" and "filename" in values and "v" not in values:
+            try:
+                values["v"] = int(os.stat(os.path.join(app.static_folder, values["filename"])).st_mtime)
+            except OSError:
+                pass
+
+    # ---------------------------------------------------
+    # CACHING HEADERS
     # ---------------------------------------------------
     @app.after_request
     def add_header(response):
-        response.headers["Cache-Control"] = (
-            "no-store, no-cache, must-revalidate, max-age=0"
-        )
-        response.headers["Pragma"] = "no-cache"
-        response.headers["Expires"] = "0"
+        # Versioned static URLs never change content; unversioned ones fall
+        # back to send_file's ETag/Last-Modified revalidation.
+        if request.endpoint == "static":
+            if "v" in request.args:
+                response.cache_control.no_cache = None
+                response.cache_control.public = True
+                response.cache_control.max_age = _STATIC_MAX_AGE
+                response.cache_control.immutable = True
+            return response
+
+        # Other streamed files (send_file) don't need the no-cache set.
+        if response.direct_passthrough:
+            return response
+
+        # Polled JSON (game state, jackpots, transactions): keep a private copy
+        # and revalidate with If-None-Match, so unchanged polls get a 304.
+        if request.method == "GET" and response.status_code == 200 and response.is_json:
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            response.add_etag()
+            return response.make_conditional(request)
+
+        response.headers.update(_NO_CACHE_HEADERS)
         return response
 
     # ---------------------------------------------------
@@ -221,14 +238,14 @@ init_socketio(socketio)
 # Refund any Royal21Seat escrows from a previous dirty shutdown
 with app.app_context():
     try:
-        from models import Royal21Seat, User
+        from models import Royal21Seat, credit_coins
         orphaned = Royal21Seat.query.all()
+        refunds = {}
         for seat_rec in orphaned:
-            user = User.query.get(seat_rec.user_id)
-            if user:
-                user.coins = int(user.coins) + seat_rec.coins_escrowed
+            refunds[seat_rec.user_id] = refunds.get(seat_rec.user_id, 0) + int(seat_rec.coins_escrowed)
             db.session.delete(seat_rec)
         if orphaned:
+            credit_coins(refunds)
             db.session.commit()
             app.logger.info("Refunded %d orphaned Royal21Seat escrows on startup.", len(orphaned))
     except Exception:
@@ -1,8 +1,8 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_user, logout_user, login_required, current_user
-from extensions import db
+from sqlalchemy.exc import IntegrityError
+from extensions import db, commit_if_pending
 from models import User
-from werkzeug.security import generate_password_hash, check_password_hash
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
 
@@ -26,20 +26,12 @@ def register():
             flash("Passwords do not match.", "danger")
             return render_template("register.html")
 
-        if User.query.filter_by(username=username).first():
-            flash("Username already taken.", "danger")
-            return render_template("register.html")
-
-        if User.query.filter_by(email=email).first():
-            flash("Email already registered.", "danger")
-            return render_template("register.html")
-
+        # The unique constraints on username/email do the duplicate check:
+        # a successful registration is a single INSERT, and only a conflict
+        # pays for the lookup that picks the error message.
         try:
-            user = User(
-                username=username,
-                email=email,
-                password_hash=generate_password_hash(password),
-            )
+            user = User(username=username, email=email)
+            user.set_password(password)
             db.session.add(user)
             db.session.commit()
 
@@ -47,6 +39,23 @@ def register():
             flash("Registration successful!", "success")
             return redirect(url_for("game.lobby"))
 
+        except IntegrityError:
+            db.session.rollback()
+            taken = db.session.execute(
+                db.select(User.username).where(
+                    (User.username == username) |
+                    (db.func.lower(User.email) == email)
+                ).limit(2)
+            ).scalars().all()
+
+            if username in taken:
+                flash("Username already taken.", "danger")
+            elif taken:
+                flash("Email already registered.", "danger")
+            else:
+                flash("An error occurred during registration.", "danger")
+            return render_template("register.html")
+
         except Exception as e:
             db.session.rollback()
             flash("An error occurred during registration.", "danger")
@@ -68,12 +77,15 @@ def login():
             flash("Please enter username/email and password.", "danger")
             return render_template("login.html")
 
+        # username hits users_username_key, lower(email) hits
+        # idx_users_email_lower; PostgreSQL ORs the two index scans.
         user = User.query.filter(
             (User.username == username_or_email) |
-            (User.email == username_or_email.lower())
+            (db.func.lower(User.email) == username_or_email.lower())
         ).first()
 
-        if user and check_password_hash(user.password_hash, password):
+        if user and user.check_password(password):
+            commit_if_pending()  # persists a rehashed password
             login_user(user)
             flash("Logged in successfully.", "success")
             return redirect(url_for("game.lobby"))
@@ -95,5 +107,8 @@ def logout():
 
 
 def get_current_user():
-    return current_user if current_user.is_authenticated else None
+    # Flask-Login loads the user at most once per request (cached on g);
+    # hand back the real User so callers skip the LocalProxy on each access.
+    user = current_user._get_current_object()
+    return user if user.is_authenticated else None
 
@@ -1,5 +1,4 @@
 import secrets
-import math
 import time
 import random
 from typing import Any, Dict, List, Optional, Tuple
@@ -85,25 +84,62 @@ GAME_MODES = {
 # Utility helpers
 # -----------------------------------------------------------------------------
 
+_sysrand = secrets.SystemRandom()
+
+
 def _secure_shuffle(lst: List[Any]) -> None:
+    """
+    Fisher-Yates over the OS CSPRNG. The entropy for the whole pass is read
+    in one call (a 32-bit word per step) rather than once per step. Bounded
+    indexes use Lemire's multiply-shift: the high 32 bits of rand32 * n are
+    uniform in [0, n) once the rare low-word draws below 2**32 % n are
+    rejected, so the common path has no modulo and no retry loop.
+    """
+    words = memoryview(secrets.token_bytes(4 * len(lst))).cast('I')
+    getrandbits = _sysrand.getrandbits
     for i in range(len(lst) - 1, 0, -1):
-        j = secrets.randbelow(i + 1)
+        n = i + 1
+        m = words[i] * n
+        if (m & 0xFFFFFFFF) < n:
+            threshold = 0x100000000 % n
+            while (m & 0xFFFFFFFF) < threshold:
+                m = getrandbits(32) * n
+        j = m >> 32
         lst[i], lst[j] = lst[j], lst[i]
 
 
-def create_deck(joker: bool = False) -> List[Dict[str, str]]:
-    deck: List[Dict[str, str]] = []
-    for _ in range(2):
-        for suit in SUITS:
-            for rank in RANKS:
-                deck.append({'rank': rank, 'suit': suit})
-    if joker:
-        for _ in range(4):
-            deck.append({'rank': 'JOKER', 'suit': 'joker'})
+# Both decks are fixed; build them once and shuffle copies.
+_DECK_TEMPLATE: Tuple[Tuple[int, int], ...] = tuple(
+    (RANK_TO_CODE[rank], SUIT_TO_CODE[suit])
+    for suit in SUITS
+    for rank in RANKS
+) * 2
+_JOKER_DECK_TEMPLATE: Tuple[Tuple[int, int], ...] = (
+    _DECK_TEMPLATE + ((RANK_TO_CODE['JOKER'], SUIT_TO_CODE['joker']),) * 4
+)
+
+
+def create_deck(joker: bool = False) -> List[Tuple[int, int]]:
+    """
+    Shuffled deck as (rank_code, suit_code) pairs, the form the deck tables
+    store, so no per-card dicts are built just to be converted back.
+    """
+    deck = list(_JOKER_DECK_TEMPLATE if joker else _DECK_TEMPLATE)
     _secure_shuffle(deck)
     return deck
 
 
+def _insert_deck_rows(model, deck: List[Tuple[int, int]], **keys: int) -> None:
+    """
+    Store a shuffled deck as one executemany INSERT (a single multi-row
+    statement on PostgreSQL) instead of flushing an ORM object per card.
+    """
+    db.session.execute(
+        db.insert(model),
+        [dict(keys, pos=pos, rank_code=r, suit_code=s) for pos, (r, s) in enumerate(deck)],
+    )
+
+
 def _is_joker_mode(game_mode: str) -> bool:
     return game_mode in ('classic_joker', 'interactive_joker')
 
@@ -119,16 +155,6 @@ def _codes_to_card(rank_code: int, suit_code: int, chosen_value: Optional[int] =
     return card
 
 
-def _card_to_codes(card: Dict[str, Any]) -> Tuple[int, int]:
-    rank = card['rank']
-    suit = card['suit']
-    if rank not in RANK_TO_CODE:
-        raise ValueError(f"Unknown rank: {rank}")
-    if suit not in SUIT_TO_CODE:
-        raise ValueError(f"Unknown suit: {suit}")
-    return RANK_TO_CODE[rank], SUIT_TO_CODE[suit]
-
-
 def _get_match_state(match_id: int) -> MatchState:
     ms = MatchState.query.filter_by(match_id=match_id).first()
     if not ms:
@@ -182,6 +208,25 @@ def _hand_cards(match_id: int, turn_index: int, round_index: int, box_index: int
     return [_codes_to_card(r.rank_code, r.suit_code, r.joker_chosen_value) for r in rows]
 
 
+def _round_hand_cards(match_id: int, turn_index: int, round_index: int) -> Dict[Tuple[int, int], List[Dict[str, Any]]]:
+    """Every hand's cards for a round in one query, keyed by (box_index, hand_index)."""
+    rows = (
+        MatchHandCard.query.filter_by(
+            match_id=match_id,
+            turn_index=turn_index,
+            round_index=round_index
+        )
+        .order_by(MatchHandCard.box_index.asc(), MatchHandCard.hand_index.asc(), MatchHandCard.seq.asc())
+        .all()
+    )
+    by_hand: Dict[Tuple[int, int], List[Dict[str, Any]]] = {}
+    for r in rows:
+        by_hand.setdefault((int(r.box_index), int(r.hand_index)), []).append(
+            _codes_to_card(r.rank_code, r.suit_code, r.joker_chosen_value)
+        )
+    return by_hand
+
+
 def _dealer_cards(match_id: int, turn_index: int, round_index: int) -> List[Dict[str, Any]]:
     rows = (
         MatchDealerCard.query.filter_by(
@@ -229,7 +274,21 @@ def _unassigned_joker_seqs_for_dealer(match_id: int, turn_index: int, round_inde
     return [int(r.seq) for r in rows if r.joker_chosen_value is None]
 
 
+# Opening hands are the common case: every two-card total without a joker,
+# soft-ace adjustment included (A+A is the only pair over 21).
+_TWO_CARD_TOTALS: Dict[Tuple[str, str], int] = {
+    (r1, r2): CARD_VALUES[r1] + CARD_VALUES[r2] if CARD_VALUES[r1] + CARD_VALUES[r2] <= 21 else 12
+    for r1 in RANKS
+    for r2 in RANKS
+}
+
+
 def hand_value(cards: List[Dict[str, Any]]) -> int:
+    if len(cards) == 2:
+        total = _TWO_CARD_TOTALS.get((cards[0]['rank'], cards[1]['rank']))
+        if total is not None:
+            return total
+
     total = 0
     aces = 0
     unchosen_jokers = 0
@@ -254,9 +313,15 @@ def hand_value(cards: List[Dict[str, Any]]) -> int:
             aces += 1
 
     # --- SOFT ACE ADJUSTMENT ---
-    while total > 21 and aces > 0:
-        total -= 10
-        aces -= 1
+    # Two soft aces already make 22, so at most one ace can stay at 11:
+    # count them all as 1, then lift one back if it fits.
+    if aces:
+        total -= 10 * aces
+        if total <= 11:
+            total += 10
+            aces = 1
+        else:
+            aces = 0
 
     # --- AUTO ASSIGN UNCHOSEN JOKERS (fallback safety) ---
     for _ in range(unchosen_jokers):
@@ -276,8 +341,20 @@ def hand_value(cards: List[Dict[str, Any]]) -> int:
 
     return total
 
+_TEN_VALUE_RANKS = frozenset(('10', 'J', 'Q', 'K'))
+
+
 def is_ten_value(rank: str) -> bool:
-    return rank in ('10', 'J', 'Q', 'K')
+    return rank in _TEN_VALUE_RANKS
+
+
+# Standard blackjack: A + 10-value. Joker blackjack: Joker + (10-value or A).
+_BLACKJACK_PAIRS = frozenset(
+    pair
+    for ten in _TEN_VALUE_RANKS
+    for first, second in (('A', ten), ('JOKER', ten), ('JOKER', 'A'))
+    for pair in ((first, second), (second, first))
+)
 
 
 def is_blackjack(cards: List[Dict[str, Any]]) -> bool:
@@ -293,23 +370,8 @@ def is_blackjack(cards: List[Dict[str, Any]]) -> bool:
     if len(cards) != 2:
         return False
 
-    r1 = cards[0].get('rank')
-    r2 = cards[1].get('rank')
-
-    ranks = (r1, r2)
-
-    # Standard blackjack: A + 10-value
-    if ('A' in ranks) and (is_ten_value(r1) or is_ten_value(r2)):
-        return True
-
-    # Joker blackjack: Joker + (Ten-value OR Ace)
-    if 'JOKER' in ranks:
-        other = r2 if r1 == 'JOKER' else r1
-        if other == 'A' or is_ten_value(other):
-            return True
-
     # Otherwise, NOT a blackjack (even if total == 21 via joker assignment tricks)
-    return False
+    return (cards[0].get('rank'), cards[1].get('rank')) in _BLACKJACK_PAIRS
 
 
 def _no_blackjack_after_split(hand: MatchHand) -> bool:
@@ -324,14 +386,11 @@ def _effective_split_value(card: Dict[str, Any]) -> Optional[int]:
     """
     Returns the value used for split comparison.
     - Jokers use chosen_value
-    - Face cards count as 10
+    - Face cards count as 10 (CARD_VALUES already buckets them)
     """
     if card['rank'] == 'JOKER':
         return card.get('chosen_value')
 
-    if is_ten_value(card['rank']):
-        return 10
-
     return CARD_VALUES.get(card['rank'])
 
 
@@ -426,9 +485,7 @@ def init_game_state(match: Match, is_heads_up: bool = False) -> None:
 
     # create draw deck rows
     deck = create_deck(joker=_is_joker_mode(match.game_mode))
-    for pos, c in enumerate(deck):
-        r, s = _card_to_codes(c)
-        db.session.add(MatchDrawDeckCard(match_id=mid, pos=pos, rank_code=r, suit_code=s))
+    _insert_deck_rows(MatchDrawDeckCard, deck, match_id=mid)
 
     db.session.flush()
 
@@ -464,9 +521,7 @@ def do_card_draw(match: Match, commit: bool = True) -> None:
         ms.draw_timestamp = time.time()
 
         deck = create_deck(joker=_is_joker_mode(match.game_mode))
-        for p, c in enumerate(deck):
-            r, s = _card_to_codes(c)
-            db.session.add(MatchDrawDeckCard(match_id=match.id, pos=p, rank_code=r, suit_code=s))
+        _insert_deck_rows(MatchDrawDeckCard, deck, match_id=match.id)
 
         db.session.flush()
         deck_count = len(deck)
@@ -602,9 +657,7 @@ def enter_turn(match: Match) -> None:
     db.session.query(MatchTurnDeckCard).filter_by(match_id=match.id, turn_index=turn_index).delete(synchronize_session=False)
 
     deck = create_deck(joker=_is_joker_mode(match.game_mode))
-    for pos, c in enumerate(deck):
-        r, s = _card_to_codes(c)
-        db.session.add(MatchTurnDeckCard(match_id=match.id, turn_index=turn_index, pos=pos, rank_code=r, suit_code=s))
+    _insert_deck_rows(MatchTurnDeckCard, deck, match_id=match.id, turn_index=turn_index)
 
     ms.phase = 'WAITING_BETS'
     set_decision_timer(match, "BET")
@@ -699,7 +752,27 @@ def place_bets(match: Match, bets: List[int]) -> None:
         round_index=round_index
     ).delete(synchronize_session=False)
 
+    # Opening cards: two per box then two for the dealer, read in one range
+    # query instead of one lookup per card.
+    need = 2 * len(valid_bets) + 2
+    first_pos = int(t.cards_dealt)
+    opening = (
+        MatchTurnDeckCard.query.filter(
+            MatchTurnDeckCard.match_id == match.id,
+            MatchTurnDeckCard.turn_index == turn_index,
+            MatchTurnDeckCard.pos >= first_pos,
+            MatchTurnDeckCard.pos < first_pos + need,
+        )
+        .order_by(MatchTurnDeckCard.pos.asc())
+        .all()
+    )
+
+    if len(opening) < need:
+        raise RuntimeError("Turn deck depleted")
+
     # Deal hands
+    dealt_hands: List[MatchHand] = []
+    dealt_cards: Dict[Tuple[int, int], List[Dict[str, Any]]] = {}
     for box_i, bet_units in enumerate(valid_bets):
 
         db.session.add(MatchBox(
@@ -725,6 +798,7 @@ def place_bets(match: Match, bets: List[int]) -> None:
             from_split_jokers=False,
         )
         db.session.add(hand)
+        dealt_hands.append(hand)
 
         # Insurance row exists for every hand
         db.session.add(MatchHandInsurance(
@@ -740,15 +814,11 @@ def place_bets(match: Match, bets: List[int]) -> None:
         ))
 
         # Deal 2 cards to player hand
+        dealt_cards[(box_i, 0)] = [
+            _codes_to_card(c.rank_code, c.suit_code) for c in opening[2 * box_i:2 * box_i + 2]
+        ]
         for seq in (0, 1):
-            deck_card = MatchTurnDeckCard.query.filter_by(
-                match_id=match.id,
-                turn_index=turn_index,
-                pos=int(t.cards_dealt)
-            ).first()
-
-            if not deck_card:
-                raise RuntimeError("Turn deck depleted")
+            deck_card = opening[2 * box_i + seq]
 
             db.session.add(MatchHandCard(
                 match_id=match.id,
@@ -762,18 +832,9 @@ def place_bets(match: Match, bets: List[int]) -> None:
                 joker_chosen_value=None,
             ))
 
-            t.cards_dealt = int(t.cards_dealt) + 1
-
     # Deal dealer 2 cards
     for seq in (0, 1):
-        deck_card = MatchTurnDeckCard.query.filter_by(
-            match_id=match.id,
-            turn_index=turn_index,
-            pos=int(t.cards_dealt)
-        ).first()
-
-        if not deck_card:
-            raise RuntimeError("Turn deck depleted")
+        deck_card = opening[need - 2 + seq]
 
         db.session.add(MatchDealerCard(
             match_id=match.id,
@@ -785,14 +846,12 @@ def place_bets(match: Match, bets: List[int]) -> None:
             joker_chosen_value=None,
         ))
 
-        t.cards_dealt = int(t.cards_dealt) + 1
-
+    t.cards_dealt = first_pos + need
     if int(t.cards_dealt) >= CUT_CARD_POSITION:
         t.cut_card_reached = True
 
     # Insurance logic
-    dealer = _dealer_cards(match.id, turn_index, round_index)
-    dealer_up = dealer[0]['rank']
+    dealer_up = CODE_TO_RANK[int(opening[need - 2].rank_code)]
 
     if dealer_up in ('A', 'JOKER'):
         rnd.insurance_offered = True
@@ -807,57 +866,46 @@ def place_bets(match: Match, bets: List[int]) -> None:
         db.session.commit()
         return
 
-    # Mark immediate player blackjacks
-    _mark_player_blackjacks(match, turn_index, round_index)
+    # Mark immediate player blackjacks from the cards just dealt
+    _mark_player_blackjacks(dealt_hands, dealt_cards)
 
     ms.phase = 'PLAYER_TURN'
     db.session.commit()
     _advance_to_active(match)
 
 
-def _mark_player_blackjacks(match: Match, turn_index: int, round_index: int) -> None:
-    hands = MatchHand.query.filter_by(match_id=match.id, turn_index=turn_index, round_index=round_index).all()
+def _mark_player_blackjacks(hands: List[MatchHand], cards_by_hand: Dict[Tuple[int, int], List[Dict[str, Any]]]) -> None:
     for h in hands:
-        cards = _hand_cards(match.id, turn_index, round_index, int(h.box_index), int(h.hand_index))
+        cards = cards_by_hand.get((int(h.box_index), int(h.hand_index)), [])
         if is_blackjack(cards) and not _no_blackjack_after_split(h):
             h.status = 'blackjack'
 
 
-def _resolve_dealer_blackjack(match: Match, turn_index: int, round_index: int) -> None:
+def _resolve_dealer_blackjack(
+    match: Match,
+    ms: MatchState,
+    t: MatchTurn,
+    rnd: MatchRound,
+    hands: List[MatchHand],
+    cards_by_hand: Dict[Tuple[int, int], List[Dict[str, Any]]],
+    insurance: Dict[Tuple[int, int], MatchHandInsurance],
+) -> None:
     """
-    Resolve round immediately when dealer has blackjack.
+    Resolve round immediately when dealer has blackjack: pay taken
+    insurance, push player blackjacks, everything else loses.
     Transitions safely into ROUND_RESULT with 5-second timer.
     """
 
-    ms = _get_match_state(match.id)
-    t = _get_turn(match.id, turn_index)
-
-    rnd = MatchRound.query.filter_by(
-        match_id=match.id,
-        turn_index=turn_index,
-        round_index=round_index
-    ).first()
-
-    if not rnd:
-        raise ValueError("Round missing")
-
-    hands = MatchHand.query.filter_by(
-        match_id=match.id,
-        turn_index=turn_index,
-        round_index=round_index
-    ).all()
-
     for h in hands:
-        cards = _hand_cards(
-            match.id,
-            turn_index,
-            round_index,
-            int(h.box_index),
-            int(h.hand_index)
-        )
+        key = (int(h.box_index), int(h.hand_index))
+        ins = insurance.get(key)
+
+        # Pay insurance (2:1 + original stake returned)
+        if ins and ins.taken:
+            t.chips = int(t.chips) + int(ins.amount) * 3
 
         # Player blackjack vs dealer blackjack → push
-        if is_blackjack(cards) and not _no_blackjack_after_split(h):
+        if is_blackjack(cards_by_hand.get(key, [])) and not _no_blackjack_after_split(h):
             t.chips = int(t.chips) + int(h.bet)
             h.status = 'push'
             h.result = 'push'
@@ -910,17 +958,22 @@ def handle_insurance(match: Match, decisions: List[bool]) -> None:
     if len(decisions) < len(hands):
         decisions = decisions + [False] * (len(hands) - len(decisions))
 
+    # Insurance rows and cards for every hand, loaded once for both branches
+    insurance = {
+        (int(ins.box_index), int(ins.hand_index)): ins
+        for ins in MatchHandInsurance.query.filter_by(
+            match_id=match.id,
+            turn_index=turn_index,
+            round_index=round_index,
+        ).all()
+    }
+    cards_by_hand = _round_hand_cards(match.id, turn_index, round_index)
+
     # ---------------------------------------
     # Apply insurance decisions
     # ---------------------------------------
     for i, h in enumerate(hands):
-        ins = MatchHandInsurance.query.filter_by(
-            match_id=match.id,
-            turn_index=turn_index,
-            round_index=round_index,
-            box_index=int(h.box_index),
-            hand_index=int(h.hand_index),
-        ).first()
+        ins = insurance.get((int(h.box_index), int(h.hand_index)))
 
         if not ins:
             continue
@@ -943,49 +996,13 @@ def handle_insurance(match: Match, decisions: List[bool]) -> None:
     # Dealer has blackjack
     # ---------------------------------------
     if is_blackjack(dealer):
-
-        for h in hands:
-            ins = MatchHandInsurance.query.filter_by(
-                match_id=match.id,
-                turn_index=turn_index,
-                round_index=round_index,
-                box_index=int(h.box_index),
-                hand_index=int(h.hand_index),
-            ).first()
-
-            # Pay insurance (2:1 + original stake returned)
-            if ins and ins.taken:
-                t.chips = int(t.chips) + int(ins.amount) * 3
-
-            cards = _hand_cards(
-                match.id,
-                turn_index,
-                round_index,
-                int(h.box_index),
-                int(h.hand_index)
-            )
-
-            if is_blackjack(cards) and not _no_blackjack_after_split(h):
-                t.chips = int(t.chips) + int(h.bet)
-                h.status = 'push'
-                h.result = 'push'
-            else:
-                h.status = 'lose'
-                h.result = 'lose'
-
-        rnd.resolved = True
-
-        # 🔒 Critical: enter result phase with 5-second timer
-        ms.phase = 'ROUND_RESULT'
-        set_decision_timer(match, "NEXT")
-
-        db.session.commit()
+        _resolve_dealer_blackjack(match, ms, t, rnd, hands, cards_by_hand, insurance)
         return
 
     # ---------------------------------------
     # No dealer blackjack → continue to player phase
     # ---------------------------------------
-    _mark_player_blackjacks(match, turn_index, round_index)
+    _mark_player_blackjacks(hands, cards_by_hand)
 
     ms.phase = 'PLAYER_TURN'
     db.session.commit()
@@ -1010,344 +1027,319 @@ def _advance_to_active(match: Match) -> None:
     round_index = int(rnd.round_index)
     game_mode = match.game_mode
 
-    # boxes in order
-    boxes = (
-        MatchBox.query.filter_by(
+    # Active hands in play order, one flat scan (no per-box queries)
+    hands = (
+        MatchHand.query.filter_by(
             match_id=match.id,
             turn_index=turn_index,
-            round_index=round_index
+            round_index=round_index,
+            status_code=MatchHand.STATUS['active']
         )
-        .order_by(MatchBox.box_index.asc())
+        .order_by(MatchHand.box_index.asc(), MatchHand.hand_index.asc())
         .all()
     )
 
-    for b in boxes:
-        bi = int(b.box_index)
-
-        hands = (
-            MatchHand.query.filter_by(
-                match_id=match.id,
-                turn_index=turn_index,
-                round_index=round_index,
-                box_index=bi
-            )
-            .order_by(MatchHand.hand_index.asc())
-            .all()
-        )
-
-        for h in hands:
-            hi = int(h.hand_index)
-
-            if h.status != 'active':
-                continue
+    for h in hands:
+        bi = int(h.box_index)
+        hi = int(h.hand_index)
 
-            cards = _hand_cards(match.id, turn_index, round_index, bi, hi)
+        cards = _hand_cards(match.id, turn_index, round_index, bi, hi)
+        unassigned = _has_unassigned_jokers(cards)
 
-            # Auto-stand if already 21 and deterministically valued
-            if not _has_unassigned_jokers(cards) and hand_value(cards) == 21:
-                h.status = 'stand'
-                continue
+        # Auto-stand if already 21 and deterministically valued
+        if not unassigned and hand_value(cards) == 21:
+            h.status = 'stand'
+            continue
 
-            # Move pointer to this hand
-            rnd.current_box = bi
-            rnd.current_hand = hi
+        # Move pointer to this hand
+        rnd.current_box = bi
+        rnd.current_hand = hi
 
-            # ---- JOKER CHOICE ----
-            if _is_joker_mode(game_mode) and _has_unassigned_jokers(cards):
-                ms.phase = 'JOKER_CHOICE'
-                set_decision_timer(match, "JOKER")
-                db.session.commit()
-                return
-
-            # ---- PLAYER TURN ----
-            ms.phase = 'PLAYER_TURN'
-            set_decision_timer(match, "ACTION")
+        # ---- JOKER CHOICE ----
+        if _is_joker_mode(game_mode) and unassigned:
+            ms.phase = 'JOKER_CHOICE'
+            set_decision_timer(match, "JOKER")
             db.session.commit()
             return
 
+        # ---- PLAYER TURN ----
+        ms.phase = 'PLAYER_TURN'
+        set_decision_timer(match, "ACTION")
+        db.session.commit()
+        return
+
     # No active hands left → dealer stage
     db.session.commit()
     _play_dealer(match)
 
 
-def player_action(match: Match, action: str) -> None:
-    ms = _get_match_state(match.id)
-
-    if ms.phase != 'PLAYER_TURN':
-        raise ValueError("Not in PLAYER_TURN phase")
-
-    turn_index = int(ms.current_turn)
-    t = _get_turn(match.id, turn_index)
-    rnd = _get_active_round(match.id, turn_index)
+def _deal_to_hand(match: Match, t: MatchTurn, h: MatchHand, cards: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Deal the next turn-deck card onto hand `h`. `cards` is the hand's
+    loaded card list; the new card is appended to it so callers don't
+    read the hand back after each draw.
+    """
+    deck_card = MatchTurnDeckCard.query.filter_by(
+        match_id=match.id,
+        turn_index=int(t.turn_index),
+        pos=int(t.cards_dealt)
+    ).first()
 
-    if not rnd:
-        raise ValueError("No active round")
+    if not deck_card:
+        raise RuntimeError("Turn deck depleted")
 
-    round_index = int(rnd.round_index)
-    box_index = int(rnd.current_box)
-    hand_index = int(rnd.current_hand)
+    db.session.add(MatchHandCard(
+        match_id=match.id,
+        turn_index=int(h.turn_index),
+        round_index=int(h.round_index),
+        box_index=int(h.box_index),
+        hand_index=int(h.hand_index),
+        seq=len(cards),
+        rank_code=deck_card.rank_code,
+        suit_code=deck_card.suit_code,
+        joker_chosen_value=None,
+    ))
 
-    h = _get_hand(match.id, turn_index, round_index, box_index, hand_index)
+    t.cards_dealt = int(t.cards_dealt) + 1
+    if int(t.cards_dealt) >= CUT_CARD_POSITION:
+        t.cut_card_reached = True
 
-    if h.status != 'active':
-        raise ValueError("No active hand")
+    card = _codes_to_card(deck_card.rank_code, deck_card.suit_code)
+    cards.append(card)
+    return card
 
-    cards = _hand_cards(match.id, turn_index, round_index, box_index, hand_index)
-    game_mode = match.game_mode
 
-    def _draw_to_hand() -> Tuple[str, bool]:
-        deck_card = MatchTurnDeckCard.query.filter_by(
-            match_id=match.id,
-            turn_index=turn_index,
-            pos=int(t.cards_dealt)
-        ).first()
+def _deal_to_dealer(match: Match, t: MatchTurn, round_index: int, dealer: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Dealer counterpart of _deal_to_hand: `dealer` is the loaded dealer
+    card list and gets the new card appended.
+    """
+    turn_index = int(t.turn_index)
+    deck_card = MatchTurnDeckCard.query.filter_by(
+        match_id=match.id,
+        turn_index=turn_index,
+        pos=int(t.cards_dealt)
+    ).first()
 
-        if not deck_card:
-            raise RuntimeError("Turn deck depleted")
+    if not deck_card:
+        raise RuntimeError("Turn deck depleted")
 
-        seq = MatchHandCard.query.filter_by(
-            match_id=match.id,
-            turn_index=turn_index,
-            round_index=round_index,
-            box_index=box_index,
-            hand_index=hand_index
-        ).count()
+    db.session.add(MatchDealerCard(
+        match_id=match.id,
+        turn_index=turn_index,
+        round_index=round_index,
+        seq=len(dealer),
+        rank_code=deck_card.rank_code,
+        suit_code=deck_card.suit_code,
+        joker_chosen_value=None
+    ))
 
-        db.session.add(MatchHandCard(
-            match_id=match.id,
-            turn_index=turn_index,
-            round_index=round_index,
-            box_index=box_index,
-            hand_index=hand_index,
-            seq=seq,
-            rank_code=deck_card.rank_code,
-            suit_code=deck_card.suit_code,
-            joker_chosen_value=None,
-        ))
+    t.cards_dealt = int(t.cards_dealt) + 1
+    if int(t.cards_dealt) >= CUT_CARD_POSITION:
+        t.cut_card_reached = True
 
-        t.cards_dealt = int(t.cards_dealt) + 1
-        if int(t.cards_dealt) >= CUT_CARD_POSITION:
-            t.cut_card_reached = True
+    card = _codes_to_card(deck_card.rank_code, deck_card.suit_code)
+    dealer.append(card)
+    return card
 
-        rank = CODE_TO_RANK[int(deck_card.rank_code)]
-        is_unassigned_joker = (rank == 'JOKER')
 
-        return rank, is_unassigned_joker
+# --------------------------------------------------
+# Player action handlers: (match, ms, t, rnd, h, cards)
+# --------------------------------------------------
 
+def _do_hit(match: Match, ms: MatchState, t: MatchTurn, rnd: MatchRound, h: MatchHand, cards: List[Dict[str, Any]]) -> None:
+    card = _deal_to_hand(match, t, h, cards)
 
-    # --------------------------------------------------
-    # HIT
-    # --------------------------------------------------
-    if action == 'hit':
-        rank, joker = _draw_to_hand()
+    if _is_joker_mode(match.game_mode) and card['rank'] == 'JOKER':
+        ms.phase = 'JOKER_CHOICE'
+        set_decision_timer(match, "JOKER")
         db.session.commit()
+        return
 
-        cards = _hand_cards(match.id, turn_index, round_index, box_index, hand_index)
-
-        if _is_joker_mode(game_mode) and joker and _has_unassigned_jokers(cards):
-            ms.phase = 'JOKER_CHOICE'
-            set_decision_timer(match, "JOKER")
-            db.session.commit()
-            return
-
-        val = hand_value(cards)
-
-        if val > 21:
-            h.status = 'bust'
-            db.session.commit()
-            _next_hand(match)
-            return
+    val = hand_value(cards)
 
-        if val == 21:
-            h.status = 'stand'
-            db.session.commit()
-            _next_hand(match)
-            return
-
-        set_decision_timer(match, "ACTION")
+    if val > 21:
+        h.status = 'bust'
         db.session.commit()
+        _advance_to_active(match)
         return
 
-
-    # --------------------------------------------------
-    # STAND
-    # --------------------------------------------------
-    if action == 'stand':
+    if val == 21:
         h.status = 'stand'
         db.session.commit()
-        _next_hand(match)
+        _advance_to_active(match)
         return
 
+    set_decision_timer(match, "ACTION")
+    db.session.commit()
 
-    # --------------------------------------------------
-    # DOUBLE
-    # --------------------------------------------------
-    if action == 'double':
-        if not _can_double(cards, int(t.chips), int(h.bet)):
-            raise ValueError("Cannot double")
 
-        t.chips = int(t.chips) - int(h.bet)
-        h.bet = int(h.bet) * 2
-        h.is_doubled = True
+def _do_stand(match: Match, ms: MatchState, t: MatchTurn, rnd: MatchRound, h: MatchHand, cards: List[Dict[str, Any]]) -> None:
+    h.status = 'stand'
+    db.session.commit()
+    _advance_to_active(match)
 
-        rank, joker = _draw_to_hand()
-        db.session.commit()
 
-        cards = _hand_cards(match.id, turn_index, round_index, box_index, hand_index)
+def _do_double(match: Match, ms: MatchState, t: MatchTurn, rnd: MatchRound, h: MatchHand, cards: List[Dict[str, Any]]) -> None:
+    if not _can_double(cards, int(t.chips), int(h.bet)):
+        raise ValueError("Cannot double")
 
-        if _is_joker_mode(game_mode) and joker and _has_unassigned_jokers(cards):
-            ms.phase = 'JOKER_CHOICE'
-            set_decision_timer(match, "JOKER")
-            db.session.commit()
-            return
+    t.chips = int(t.chips) - int(h.bet)
+    h.bet = int(h.bet) * 2
+    h.is_doubled = True
 
-        val = hand_value(cards)
+    card = _deal_to_hand(match, t, h, cards)
 
-        h.status = 'bust' if val > 21 else 'stand'
+    if _is_joker_mode(match.game_mode) and card['rank'] == 'JOKER':
+        ms.phase = 'JOKER_CHOICE'
+        set_decision_timer(match, "JOKER")
         db.session.commit()
-        _next_hand(match)
         return
 
+    val = hand_value(cards)
 
-    # --------------------------------------------------
-    # SPLIT
-    # --------------------------------------------------
-    if action == 'split':
+    h.status = 'bust' if val > 21 else 'stand'
+    db.session.commit()
+    _advance_to_active(match)
 
-        if not _can_split(cards, int(t.chips), int(h.bet)):
-            raise ValueError("Cannot split")
 
-        # Deduct additional bet for the new hand
-        t.chips = int(t.chips) - int(h.bet)
+def _do_split(match: Match, ms: MatchState, t: MatchTurn, rnd: MatchRound, h: MatchHand, cards: List[Dict[str, Any]]) -> None:
+    if not _can_split(cards, int(t.chips), int(h.bet)):
+        raise ValueError("Cannot split")
 
-        # Determine the insert index: place new hand immediately after current hand.
-        insert_hi = hand_index + 1
+    turn_index = int(h.turn_index)
+    round_index = int(h.round_index)
+    box_index = int(h.box_index)
+    hand_index = int(h.hand_index)
 
-        # Shift any existing hands (and dependent rows) up by 1 to make room.
-        existing_his = (
-            MatchHand.query.filter_by(
-                match_id=match.id,
-                turn_index=turn_index,
-                round_index=round_index,
-                box_index=box_index
-            )
-            .with_entities(MatchHand.hand_index)
-            .order_by(MatchHand.hand_index.desc())
-            .all()
-        )
-        existing_his = [int(r[0]) for r in existing_his]
-        for hi in existing_his:
-            if hi >= insert_hi:
-                # Hands
-                MatchHand.query.filter_by(
-                    match_id=match.id,
-                    turn_index=turn_index,
-                    round_index=round_index,
-                    box_index=box_index,
-                    hand_index=hi
-                ).update({'hand_index': hi + 1})
-                # Hand cards
-                MatchHandCard.query.filter_by(
-                    match_id=match.id,
-                    turn_index=turn_index,
-                    round_index=round_index,
-                    box_index=box_index,
-                    hand_index=hi
-                ).update({'hand_index': hi + 1})
-                # Insurance rows (if any)
-                MatchHandInsurance.query.filter_by(
-                    match_id=match.id,
-                    turn_index=turn_index,
-                    round_index=round_index,
-                    box_index=box_index,
-                    hand_index=hi
-                ).update({'hand_index': hi + 1})
-
-        new_hi = insert_hi
-
-        # Create the new hand with duplicated bet
-        new_hand = MatchHand(
-            match_id=match.id,
-            turn_index=turn_index,
-            round_index=round_index,
-            box_index=box_index,
-            hand_index=new_hi,
-            bet=int(h.bet),
-            is_split=True,
-            is_doubled=False,
-            from_split_aces=(cards[0]['rank'] == 'A'),
-            from_split_jokers=(cards[0]['rank'] == 'JOKER'),
-        )
-        db.session.add(new_hand)
+    # Deduct additional bet for the new hand
+    t.chips = int(t.chips) - int(h.bet)
 
-        # Mark original hand as a split hand too
-        h.is_split = True
-        h.from_split_aces = (cards[0]['rank'] == 'A')
-        h.from_split_jokers = (cards[0]['rank'] == 'JOKER')
+    # Determine the insert index: place new hand immediately after current hand.
+    insert_hi = hand_index + 1
 
-        # Move the second card from original hand to the new hand.
-        second_row = MatchHandCard.query.filter_by(
+    # Shift any existing hands (and dependent rows) up by 1 to make room.
+    existing_his = (
+        MatchHand.query.filter_by(
             match_id=match.id,
             turn_index=turn_index,
             round_index=round_index,
-            box_index=box_index,
-            hand_index=hand_index,
-            seq=1
-        ).first()
-        if not second_row:
-            raise RuntimeError("Cannot split: missing second card")
-
-        second_row.hand_index = new_hi
-        second_row.seq = 0
-
-        # Draw one card to original hand, then one card to the new hand.
-        def _draw_to_specific_hand(target_hi: int) -> bool:
-            """Returns True if drawn card is an unassigned joker."""
-            deck_card = MatchTurnDeckCard.query.filter_by(
+            box_index=box_index
+        )
+        .with_entities(MatchHand.hand_index)
+        .order_by(MatchHand.hand_index.desc())
+        .all()
+    )
+    existing_his = [int(r[0]) for r in existing_his]
+    for hi in existing_his:
+        if hi >= insert_hi:
+            # Hands
+            MatchHand.query.filter_by(
                 match_id=match.id,
                 turn_index=turn_index,
-                pos=int(t.cards_dealt)
-            ).first()
-            if not deck_card:
-                raise RuntimeError("Turn deck depleted")
-
-            seq = MatchHandCard.query.filter_by(
+                round_index=round_index,
+                box_index=box_index,
+                hand_index=hi
+            ).update({'hand_index': hi + 1})
+            # Hand cards
+            MatchHandCard.query.filter_by(
                 match_id=match.id,
                 turn_index=turn_index,
                 round_index=round_index,
                 box_index=box_index,
-                hand_index=target_hi
-            ).count()
-
-            db.session.add(MatchHandCard(
+                hand_index=hi
+            ).update({'hand_index': hi + 1})
+            # Insurance rows (if any)
+            MatchHandInsurance.query.filter_by(
                 match_id=match.id,
                 turn_index=turn_index,
                 round_index=round_index,
                 box_index=box_index,
-                hand_index=target_hi,
-                seq=seq,
-                rank_code=deck_card.rank_code,
-                suit_code=deck_card.suit_code,
-                joker_chosen_value=None,
-            ))
+                hand_index=hi
+            ).update({'hand_index': hi + 1})
 
-            t.cards_dealt = int(t.cards_dealt) + 1
-            if int(t.cards_dealt) >= CUT_CARD_POSITION:
-                t.cut_card_reached = True
+    new_hi = insert_hi
 
-            return CODE_TO_RANK[int(deck_card.rank_code)] == 'JOKER'
+    # Create the new hand with duplicated bet
+    new_hand = MatchHand(
+        match_id=match.id,
+        turn_index=turn_index,
+        round_index=round_index,
+        box_index=box_index,
+        hand_index=new_hi,
+        bet=int(h.bet),
+        is_split=True,
+        is_doubled=False,
+        from_split_aces=(cards[0]['rank'] == 'A'),
+        from_split_jokers=(cards[0]['rank'] == 'JOKER'),
+    )
+    db.session.add(new_hand)
 
-        _draw_to_specific_hand(hand_index)
-        _draw_to_specific_hand(new_hi)
+    # Mark original hand as a split hand too
+    h.is_split = True
+    h.from_split_aces = (cards[0]['rank'] == 'A')
+    h.from_split_jokers = (cards[0]['rank'] == 'JOKER')
 
-        # Let the state machine pick the next active hand (and joker-choice phase if needed)
-        db.session.flush()
-        _advance_to_active(match)
-        return
+    # Move the second card from original hand to the new hand.
+    second_row = MatchHandCard.query.filter_by(
+        match_id=match.id,
+        turn_index=turn_index,
+        round_index=round_index,
+        box_index=box_index,
+        hand_index=hand_index,
+        seq=1
+    ).first()
+    if not second_row:
+        raise RuntimeError("Cannot split: missing second card")
+
+    second_row.hand_index = new_hi
+    second_row.seq = 0
+
+    # Draw one card to original hand, then one card to the new hand.
+    _deal_to_hand(match, t, h, [cards[0]])
+    _deal_to_hand(match, t, new_hand, [cards[1]])
 
-    raise ValueError(f"Unknown action: {action}")
+    # Let the state machine pick the next active hand (and joker-choice phase if needed)
+    db.session.flush()
+    _advance_to_active(match)
+
+
+_PLAYER_ACTIONS = {
+    'hit': _do_hit,
+    'stand': _do_stand,
+    'double': _do_double,
+    'split': _do_split,
+}
+
+
+def player_action(match: Match, action: str) -> None:
+    ms = _get_match_state(match.id)
+
+    if ms.phase != 'PLAYER_TURN':
+        raise ValueError("Not in PLAYER_TURN phase")
+
+    turn_index = int(ms.current_turn)
+    t = _get_turn(match.id, turn_index)
+    rnd = _get_active_round(match.id, turn_index)
 
+    if not rnd:
+        raise ValueError("No active round")
 
+    round_index = int(rnd.round_index)
+    box_index = int(rnd.current_box)
+    hand_index = int(rnd.current_hand)
+
+    h = _get_hand(match.id, turn_index, round_index, box_index, hand_index)
+
+    if int(h.status_code) != MatchHand.STATUS['active']:
+        raise ValueError("No active hand")
+
+    handler = _PLAYER_ACTIONS.get(action)
+    if handler is None:
+        raise ValueError(f"Unknown action: {action}")
+
+    cards = _hand_cards(match.id, turn_index, round_index, box_index, hand_index)
+    handler(match, ms, t, rnd, h, cards)
 
 
 def assign_joker_values(match: Match, values: List[str]) -> None:
@@ -1398,40 +1390,25 @@ def assign_joker_values(match: Match, values: List[str]) -> None:
     if bool(h.is_doubled) and len(cards) == 3 and h.status == 'active':
         h.status = 'bust' if hv > 21 else 'stand'
         db.session.commit()
-        _next_hand(match)
+        _advance_to_active(match)
         return
 
     if hv > 21:
         h.status = 'bust'
         db.session.commit()
-        _next_hand(match)
+        _advance_to_active(match)
         return
 
     if hv == 21:
         h.status = 'stand'
         db.session.commit()
-        _next_hand(match)
+        _advance_to_active(match)
         return
 
     ms.phase = 'PLAYER_TURN'
     db.session.commit()
 
 
-def _next_hand(match: Match) -> None:
-    """
-    Move to next active hand based on round ordering, then advance_to_active().
-    """
-    ms = _get_match_state(match.id)
-    turn_index = int(ms.current_turn)
-    rnd = _get_active_round(match.id, turn_index)
-    if not rnd:
-        return
-
-    # We simply call advance_to_active which scans in-order for active hands
-    db.session.commit()
-    _advance_to_active(match)
-
-
 def _play_dealer(match: Match) -> None:
     ms = _get_match_state(match.id)
     turn_index = int(ms.current_turn)
@@ -1449,14 +1426,22 @@ def _play_dealer(match: Match) -> None:
     # 1) If no player hands are standing/blackjack,
     #    nothing to compare -> resolve immediately
     # --------------------------------------------------
-    hands = MatchHand.query.filter_by(
-        match_id=match.id,
-        turn_index=turn_index,
-        round_index=round_index
-    ).all()
+    # Only which statuses occur matters, not how many hands hold them
+    statuses = {
+        int(r[0])
+        for r in MatchHand.query.filter_by(
+            match_id=match.id,
+            turn_index=turn_index,
+            round_index=round_index
+        )
+        .with_entities(MatchHand.status_code)
+        .distinct()
+        .all()
+    }
+    any_player_blackjack = MatchHand.STATUS['blackjack'] in statuses
+    any_player_stand = MatchHand.STATUS['stand'] in statuses
 
-    any_standing = any(h.status in ('stand', 'blackjack') for h in hands)
-    if not any_standing:
+    if not (any_player_stand or any_player_blackjack):
         _resolve_hands(match)
         return
 
@@ -1470,8 +1455,6 @@ def _play_dealer(match: Match) -> None:
     # --------------------------------------------------
     if _is_classic_mode(game_mode):
 
-        any_player_blackjack = any(h.status == 'blackjack' for h in hands)
-        any_player_stand = any(h.status == 'stand' for h in hands)
         dealer_has_blackjack = is_blackjack(dealer)
 
         if any_player_blackjack and not any_player_stand and not dealer_has_blackjack:
@@ -1493,44 +1476,14 @@ def _play_dealer(match: Match) -> None:
     # --------------------------------------------------
     if _is_classic_mode(game_mode):
 
-        # Dealer hits until 17 or more
+        # Dealer hits until 17 or more. Draws append to the loaded list;
+        # the pause below or _resolve_hands commits them together.
         while hand_value(dealer) < 17:
 
-            deck_card = MatchTurnDeckCard.query.filter_by(
-                match_id=match.id,
-                turn_index=turn_index,
-                pos=int(t.cards_dealt)
-            ).first()
-
-            if not deck_card:
-                raise RuntimeError("Turn deck depleted")
-
-            seq = MatchDealerCard.query.filter_by(
-                match_id=match.id,
-                turn_index=turn_index,
-                round_index=round_index
-            ).count()
-
-            db.session.add(MatchDealerCard(
-                match_id=match.id,
-                turn_index=turn_index,
-                round_index=round_index,
-                seq=seq,
-                rank_code=deck_card.rank_code,
-                suit_code=deck_card.suit_code,
-                joker_chosen_value=None
-            ))
-
-            t.cards_dealt = int(t.cards_dealt) + 1
-            if int(t.cards_dealt) >= CUT_CARD_POSITION:
-                t.cut_card_reached = True
-
-            db.session.commit()
-
-            dealer = _dealer_cards(match.id, turn_index, round_index)
+            card = _deal_to_dealer(match, t, round_index, dealer)
 
             # If dealer drew a Joker, pause immediately
-            if _is_joker_mode(game_mode) and _has_unassigned_jokers(dealer):
+            if _is_joker_mode(game_mode) and card['rank'] == 'JOKER':
                 ms.phase = 'DEALER_JOKER_CHOICE'
                 set_decision_timer(match, "DEALER_JOKER")
                 db.session.commit()
@@ -1583,41 +1536,9 @@ def dealer_action(match: Match, action: str) -> None:
     # HIT
     # --------------------------------------------------
     if action == 'hit':
-        deck_card = MatchTurnDeckCard.query.filter_by(
-            match_id=match.id,
-            turn_index=turn_index,
-            pos=int(t.cards_dealt)
-        ).first()
-
-        if not deck_card:
-            raise RuntimeError("Turn deck depleted")
-
-        seq = MatchDealerCard.query.filter_by(
-            match_id=match.id,
-            turn_index=turn_index,
-            round_index=round_index
-        ).count()
-
-        db.session.add(MatchDealerCard(
-            match_id=match.id,
-            turn_index=turn_index,
-            round_index=round_index,
-            seq=seq,
-            rank_code=deck_card.rank_code,
-            suit_code=deck_card.suit_code,
-            joker_chosen_value=None
-        ))
-
-        t.cards_dealt = int(t.cards_dealt) + 1
-        if int(t.cards_dealt) >= CUT_CARD_POSITION:
-            t.cut_card_reached = True
-
-        db.session.commit()
-
         dealer = _dealer_cards(match.id, turn_index, round_index)
-        
+        _deal_to_dealer(match, t, round_index, dealer)
 
-        
         # --------------------------------------------------
         # 2) Dealer Joker Handling (INITIAL CHECK)
         # --------------------------------------------------
@@ -1728,26 +1649,24 @@ def _resolve_hands(match: Match) -> None:
         round_index=round_index
     ).all()
 
+    # Only standing hands need their cards; load the round's in one query.
+    cards_by_hand = _round_hand_cards(match.id, turn_index, round_index)
+
     for h in hands:
-        cards = _hand_cards(
-            match.id,
-            turn_index,
-            round_index,
-            int(h.box_index),
-            int(h.hand_index)
-        )
+        cards = cards_by_hand.get((int(h.box_index), int(h.hand_index)), [])
+        status = int(h.status_code)
 
         # -----------------------------
         # BUST
         # -----------------------------
-        if h.status == 'bust':
+        if status == MatchHand.STATUS['bust']:
             h.result = 'lose'
             continue
 
         # -----------------------------
         # BLACKJACK
         # -----------------------------
-        if h.status == 'blackjack':
+        if status == MatchHand.STATUS['blackjack']:
             if dealer_blackjack:
                 t.chips = int(t.chips) + int(h.bet)
                 h.result = 'push'
@@ -1760,7 +1679,7 @@ def _resolve_hands(match: Match) -> None:
         # -----------------------------
         # STAND
         # -----------------------------
-        if h.status == 'stand':
+        if status == MatchHand.STATUS['stand']:
             player_val = hand_value(cards)
         
             # A dealer blackjack always beats any non-blackjack 21 (or any stand hand).
@@ -1848,17 +1767,19 @@ def end_turn(match: Match) -> bool:
         # match over
         ms.match_over = True
 
-        # last chips for each player
-        p1_last = (
-            MatchTurnResult.query.filter_by(match_id=match.id, player_num=1)
+        # last chips for each player: this turn's player just finished
+        # with t.chips, so only the other player's result is read back
+        other_num = 2 if player_num == 1 else 1
+        other_last = (
+            MatchTurnResult.query.filter_by(match_id=match.id, player_num=other_num)
             .order_by(MatchTurnResult.turn_number.desc()).first()
         )
-        p2_last = (
-            MatchTurnResult.query.filter_by(match_id=match.id, player_num=2)
-            .order_by(MatchTurnResult.turn_number.desc()).first()
-        )
-        p1 = int(p1_last.chips_end) if p1_last else 0
-        p2 = int(p2_last.chips_end) if p2_last else 0
+        final = {
+            player_num: int(t.chips),
+            other_num: int(other_last.chips_end) if other_last else 0,
+        }
+        p1 = final[1]
+        p2 = final[2]
 
         if p1 > p2:
             winner = 1
@@ -1882,31 +1803,44 @@ def end_turn(match: Match) -> bool:
 # Timers (kept compatible with your match fields)
 # -----------------------------------------------------------------------------
 
-def check_timeout(match: Match) -> bool:
-    if not match.is_waiting_decision or not match.decision_started_at:
+def check_timeout(match: Match, now: Optional[float] = None) -> bool:
+    if not match.is_waiting_decision or match.decision_deadline is None:
         return False
-    timeout = ROUND_RESULT_TIMEOUT if match.decision_type == 'NEXT' else DECISION_TIMEOUT
-    return (time.time() - match.decision_started_at) > timeout
+    if now is None:
+        now = time.time()
+    return now > match.decision_deadline
+
+
+def timed_out_clause(now: Optional[float] = None):
+    """SQL form of check_timeout(), for selecting expired matches in bulk."""
+    if now is None:
+        now = time.time()
+    return db.and_(
+        Match.is_waiting_decision.is_(True),
+        Match.decision_deadline < now,
+    )
 
 
 def set_decision_timer(match: Match, decision_type: str) -> None:
-    match.decision_started_at = time.time()
+    now = time.time()
+    timeout = ROUND_RESULT_TIMEOUT if decision_type == 'NEXT' else DECISION_TIMEOUT
+    match.decision_started_at = now
+    match.decision_deadline = now + timeout
     match.decision_type = decision_type
     match.is_waiting_decision = True
 
 
 def clear_decision_timer(match: Match) -> None:
     match.decision_started_at = None
+    match.decision_deadline = None
     match.decision_type = None
     match.is_waiting_decision = False
 
 
 def get_timer_remaining(match: Match) -> Optional[float]:
-    if not match.is_waiting_decision or not match.decision_started_at:
+    if not match.is_waiting_decision or match.decision_deadline is None:
         return None
-    timeout = ROUND_RESULT_TIMEOUT if match.decision_type == 'NEXT' else DECISION_TIMEOUT
-    remaining = timeout - (time.time() - match.decision_started_at)
-    return max(0, remaining)
+    return max(0, match.decision_deadline - time.time())
 
 
 def apply_timeout(match: Match) -> bool:
@@ -1924,10 +1858,22 @@ def apply_timeout(match: Match) -> bool:
     phase = ms.phase
 
     # --------------------------------------------------
-    # 🔐 Clear expired timer FIRST to avoid re-trigger loops
+    # 🔐 Clear expired timer FIRST to avoid re-trigger loops.
+    # Flushed, not committed: the caller's row lock must stay held
+    # until the default action below commits.
     # --------------------------------------------------
     clear_decision_timer(match)
+    db.session.flush()
+
+    changed = _apply_default_action(match, ms, phase)
+
+    # Paths that change nothing still have to persist the cleared timer
     db.session.commit()
+    return changed
+
+
+def _apply_default_action(match: Match, ms: MatchState, phase: str) -> bool:
+    """Default action for an expired decision. Returns True if state changed."""
 
     # --------------------------------------------------
     # CARD DRAW (no timeout action)
@@ -2064,9 +2010,137 @@ def apply_timeout(match: Match) -> bool:
 # Client state builder (assembled from SQL rows)
 # -----------------------------------------------------------------------------
 
+def _round_view(match: Match, ms: MatchState, t: MatchTurn, rnd: MatchRound, user_player_num: int, spectator: bool) -> Dict[str, Any]:
+    round_index = int(rnd.round_index)
+
+    show_all_dealer = bool(rnd.resolved) or ms.phase in (
+        'DEALER_TURN',
+        'DEALER_JOKER_CHOICE'
+    )
+    is_dealer = (
+        int(t.dealer_role) == user_player_num
+    ) and (not spectator)
+
+    dealer = _dealer_cards(
+        match.id,
+        int(t.turn_index),
+        round_index
+    )
+
+    if show_all_dealer or is_dealer:
+        dealer_cards_view = dealer
+    else:
+        dealer_cards_view = (
+            [dealer[0], {'rank': '?', 'suit': '?'}]
+            if dealer else []
+        )
+
+    view: Dict[str, Any] = {
+        'dealer_cards': dealer_cards_view,
+        'dealer_value': (
+            hand_value(dealer)
+            if (show_all_dealer or is_dealer)
+            else (
+                hand_value([dealer[0]])
+                if dealer else 0
+            )
+        ),
+        'current_box': int(rnd.current_box),
+        'current_hand': int(rnd.current_hand),
+        'insurance_offered': bool(rnd.insurance_offered),
+        'resolved': bool(rnd.resolved),
+        'boxes': [],
+    }
+
+    boxes = (
+        MatchBox.query.filter_by(
+            match_id=match.id,
+            turn_index=int(t.turn_index),
+            round_index=round_index
+        )
+        .order_by(MatchBox.box_index.asc())
+        .all()
+    )
+
+    # One query each for the round's hands and cards, instead
+    # of one per box and one per hand.
+    all_hands = (
+        MatchHand.query.filter_by(
+            match_id=match.id,
+            turn_index=int(t.turn_index),
+            round_index=round_index
+        )
+        .order_by(MatchHand.box_index.asc(), MatchHand.hand_index.asc())
+        .all()
+    )
+    hands_by_box: Dict[int, List[MatchHand]] = {}
+    for h in all_hands:
+        hands_by_box.setdefault(int(h.box_index), []).append(h)
+    cards_by_hand = _round_hand_cards(match.id, int(t.turn_index), round_index)
+
+    # Only the hand being played can show double/split buttons.
+    current = (int(rnd.current_box), int(rnd.current_hand))
+
+    for b in boxes:
+        bi = int(b.box_index)
+
+        box_data = {'hands': []}
+
+        for h in hands_by_box.get(bi, []):
+            hi = int(h.hand_index)
+            cards = cards_by_hand.get((bi, hi), [])
+            hv = hand_value(cards)
+
+            can_split = False
+            can_double = False
+
+            if h.status == 'active' and (bi, hi) == current:
+                can_split = _can_split(
+                    cards,
+                    int(t.chips),
+                    int(h.bet)
+                )
+                can_double = _can_double(
+                    cards,
+                    int(t.chips),
+                    int(h.bet)
+                )
+
+            box_data['hands'].append({
+                'cards': cards,
+                'bet': units_to_chips(h.bet),
+                'status': h.status,
+                'result': h.result,
+                'is_split': bool(h.is_split),
+                'is_doubled': bool(h.is_doubled),
+                'value': hv,
+                'can_split': can_split,
+                'can_double': can_double,
+                'has_unassigned_jokers': _has_unassigned_jokers(cards),
+            })
+
+        view['boxes'].append(box_data)
+
+    return view
+
+
+# Resolved rounds are frozen, and every viewer sees them in full (dealer
+# cards included), so their view is built once per worker for the result
+# window's polls. Entries are never stale, the size cap just bounds memory.
+_resolved_round_views: Dict[Tuple[int, int, int], Dict[str, Any]] = {}
+_RESOLVED_ROUND_VIEW_LIMIT = 1024
+
+
 def get_client_state(match: Match, user_player_num: int, spectator: bool = False) -> Dict[str, Any]:
     ms = _get_match_state(match.id)
 
+    # Every turn row is needed below anyway; its length is the turn count.
+    turns = (
+        MatchTurn.query.filter_by(match_id=match.id)
+        .order_by(MatchTurn.turn_index.asc())
+        .all()
+    )
+
     cs: Dict[str, Any] = {
         'current_turn': int(ms.current_turn),
         'phase': ms.phase,
@@ -2079,7 +2153,7 @@ def get_client_state(match: Match, user_player_num: int, spectator: bool = False
         'game_mode': match.game_mode,
         'results': {},
         'match_result': None,
-        'total_turns': MatchTurn.query.filter_by(match_id=match.id).count() or 4,
+        'total_turns': len(turns) or 4,
     }
 
     # --------------------------------------------------
@@ -2122,12 +2196,6 @@ def get_client_state(match: Match, user_player_num: int, spectator: bool = False
     # --------------------------------------------------
     # Current turn
     # --------------------------------------------------
-    turns = (
-        MatchTurn.query.filter_by(match_id=match.id)
-        .order_by(MatchTurn.turn_index.asc())
-        .all()
-    )
-
     # 🔥 HEADER CHIP DEFAULTS (fallback)
     player1_chips = 100
     player2_chips = 100
@@ -2197,113 +2265,17 @@ def get_client_state(match: Match, user_player_num: int, spectator: bool = False
                 round_index=int(t.active_round_index)
             ).first()
 
-            if rnd:
-                round_index = int(rnd.round_index)
-
-                show_all_dealer = bool(rnd.resolved) or ms.phase in (
-                    'DEALER_TURN',
-                    'DEALER_JOKER_CHOICE'
-                )
-                is_dealer = (
-                    int(t.dealer_role) == user_player_num
-                ) and (not spectator)
-
-                dealer = _dealer_cards(
-                    match.id,
-                    int(t.turn_index),
-                    round_index
-                )
-
-                if show_all_dealer or is_dealer:
-                    dealer_cards_view = dealer
-                else:
-                    dealer_cards_view = (
-                        [dealer[0], {'rank': '?', 'suit': '?'}]
-                        if dealer else []
-                    )
-
-                cs['round'] = {
-                    'dealer_cards': dealer_cards_view,
-                    'dealer_value': (
-                        hand_value(dealer)
-                        if (show_all_dealer or is_dealer)
-                        else (
-                            hand_value([dealer[0]])
-                            if dealer else 0
-                        )
-                    ),
-                    'current_box': int(rnd.current_box),
-                    'current_hand': int(rnd.current_hand),
-                    'insurance_offered': bool(rnd.insurance_offered),
-                    'resolved': bool(rnd.resolved),
-                    'boxes': [],
-                }
-
-                boxes = (
-                    MatchBox.query.filter_by(
-                        match_id=match.id,
-                        turn_index=int(t.turn_index),
-                        round_index=round_index
-                    )
-                    .order_by(MatchBox.box_index.asc())
-                    .all()
-                )
-
-                for b in boxes:
-                    bi = int(b.box_index)
-                    hands = (
-                        MatchHand.query.filter_by(
-                            match_id=match.id,
-                            turn_index=int(t.turn_index),
-                            round_index=round_index,
-                            box_index=bi
-                        )
-                        .order_by(MatchHand.hand_index.asc())
-                        .all()
-                    )
-
-                    box_data = {'hands': []}
-
-                    for h in hands:
-                        hi = int(h.hand_index)
-                        cards = _hand_cards(
-                            match.id,
-                            int(t.turn_index),
-                            round_index,
-                            bi,
-                            hi
-                        )
-                        hv = hand_value(cards)
-
-                        can_split = False
-                        can_double = False
-
-                        if h.status == 'active':
-                            can_split = _can_split(
-                                cards,
-                                int(t.chips),
-                                int(h.bet)
-                            )
-                            can_double = _can_double(
-                                cards,
-                                int(t.chips),
-                                int(h.bet)
-                            )
-
-                        box_data['hands'].append({
-                            'cards': cards,
-                            'bet': units_to_chips(h.bet),
-                            'status': h.status,
-                            'result': h.result,
-                            'is_split': bool(h.is_split),
-                            'is_doubled': bool(h.is_doubled),
-                            'value': hv,
-                            'can_split': can_split,
-                            'can_double': can_double,
-                            'has_unassigned_jokers': _has_unassigned_jokers(cards),
-                        })
-
-                    cs['round']['boxes'].append(box_data)
+            if rnd and rnd.resolved:
+                key = (match.id, int(t.turn_index), int(rnd.round_index))
+                view = _resolved_round_views.get(key)
+                if view is None:
+                    view = _round_view(match, ms, t, rnd, user_player_num, spectator)
+                    if len(_resolved_round_views) >= _RESOLVED_ROUND_VIEW_LIMIT:
+                        _resolved_round_views.clear()
+                    _resolved_round_views[key] = view
+                cs['round'] = view
+            elif rnd:
+                cs['round'] = _round_view(match, ms, t, rnd, user_player_num, spectator)
 
     # --------------------------------------------------
     # Joker prompts
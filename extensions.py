@@ -1,7 +1,56 @@
 # extensions.py
 
+import sys
+
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 
 db = SQLAlchemy()
 login_manager = LoginManager()
+
+
+def normalize_database_url(url: str) -> str:
+    """
+    Heroku-style DATABASE_URL historically used 'postgres://', which SQLAlchemy
+    expects as 'postgresql://'. Normalize if needed.
+    """
+    if url.startswith("postgres://"):
+        return "postgresql://" + url[len("postgres://") :]
+    return url
+
+
+# Lazy "get or create" helpers flush their new rows, which empties
+# session.new; remember that a flush happened so read endpoints can skip
+# the commit (and its fsync) when nothing was written.
+@event.listens_for(Session, 'after_flush')
+def _mark_flushed(session, flush_context):
+    session.info['has_writes'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def _clear_flushed(session):
+    session.info.pop('has_writes', None)
+
+
+def commit_if_pending():
+    """Commit the current session only if this request wrote anything."""
+    session = db.session
+    if session.new or session.dirty or session.deleted or session.info.get('has_writes'):
+        session.commit()
+
+
+def run_blocking(fn, *args):
+    """Run CPU-heavy C code (password KDFs) without stalling the event loop.
+
+    Under the eventlet worker every request and socket shares one OS
+    thread, so hand the call to eventlet's native thread pool; the C code
+    releases the GIL while it runs. Sync/threaded workers just call it.
+    """
+    if 'eventlet' in sys.modules:
+        from eventlet import patcher, tpool
+        if patcher.is_monkey_patched('thread'):
+            return tpool.execute(fn, *args)
+    return fn(*args)
@@ -1,8 +1,12 @@
+import logging
+
 from flask import (
     Blueprint, request, jsonify, abort,
     session, render_template, redirect, url_for
 )
 from flask_login import login_required, current_user
+from sqlalchemy import lambda_stmt, or_, select
+from sqlalchemy.orm import selectinload
 from extensions import db
 from models import (
     Match,
@@ -36,12 +40,12 @@ from engine import (
     assign_dealer_joker_values,
     next_round_or_end_turn,
     end_turn,
-    check_timeout,      # <-- ADD
-    apply_timeout,
     get_client_state,
 )
+from match_timeouts import catch_up_timeouts
 
 game_bp = Blueprint("game", __name__, url_prefix="/game")
+log = logging.getLogger(__name__)
 
 
 # -------------------------------------------------------------------
@@ -72,6 +76,24 @@ def _get_user_player_num(match: Match) -> int:
         return 2
     abort(403, "Not a participant in this match")
 
+# Match cards show both players' usernames; load them in one batched
+# SELECT ... WHERE id IN (...) per list instead of a lazy load per card.
+_WITH_PLAYERS = (selectinload(Match.player1), selectinload(Match.player2))
+
+
+def _my_active_matches(user_id: int):
+    # Built as a lambda statement: SQLAlchemy caches the constructed and
+    # compiled statement by the lambda's code, and only user_id is re-bound
+    # on each lobby render.
+    active = Match.MATCH_STATUS["active"]
+    stmt = lambda_stmt(lambda: select(Match))
+    stmt += lambda s: s.where(
+        Match.status_code == active,
+        or_(Match.player1_id == user_id, Match.player2_id == user_id),
+    )
+    stmt += lambda s: s.order_by(Match.id.desc()).options(*_WITH_PLAYERS)
+    return db.session.execute(stmt).scalars().all()
+
 def _get_jackpot_pools_for_lobby():
     # Lobby template expects jackpot_pools.standard / jackpot_pools.joker
     standard = JackpotPool.get_active_pool("standard")
@@ -89,18 +111,13 @@ def lobby():
     user = _get_user_or_401()
 
     # Your active matches (active and user is player1 or player2)
-    my_active = (
-        Match.query
-        .filter(Match.status_code == Match.MATCH_STATUS["active"])
-        .filter((Match.player1_id == user.id) | (Match.player2_id == user.id))
-        .order_by(Match.id.desc())
-        .all()
-    )
+    my_active = _my_active_matches(user.id)
 
     # Waiting matches (waiting status)
     waiting = (
         Match.query
         .filter(Match.status_code == Match.MATCH_STATUS["waiting"])
+        .options(*_WITH_PLAYERS)
         .order_by(Match.id.desc())
         .all()
     )
@@ -129,6 +146,7 @@ def watch():
         Match.query
         .filter(Match.status_code == Match.MATCH_STATUS["active"])
         .filter(Match.is_spectatable.is_(True))
+        .options(*_WITH_PLAYERS)
         .order_by(Match.id.desc())
         .limit(25)
         .all()
@@ -325,8 +343,7 @@ def start_game(match_id):
     _ = _get_user_player_num(match)
 
     # Apply any overdue automatic actions BEFORE proceeding
-    while check_timeout(match):
-        apply_timeout(match)
+    catch_up_timeouts(match)
 
     if match.status != "active":
         return jsonify({"error": "Match is not active"}), 400
@@ -349,8 +366,7 @@ def draw_card(match_id):
     user_num = _get_user_player_num(match)
 
     # Apply any overdue automatic actions BEFORE proceeding
-    while check_timeout(match):
-        apply_timeout(match)
+    catch_up_timeouts(match)
 
     do_card_draw(match)
     return jsonify(get_client_state(match, user_num))
@@ -363,8 +379,7 @@ def choice(match_id):
     user_num = _get_user_player_num(match)
 
     # Apply any overdue automatic actions BEFORE proceeding
-    while check_timeout(match):
-        apply_timeout(match)
+    catch_up_timeouts(match)
 
     data = request.get_json() or {}
 
@@ -383,8 +398,7 @@ def bet(match_id):
     user_num = _get_user_player_num(match)
 
     # Apply any overdue automatic actions BEFORE proceeding
-    while check_timeout(match):
-        apply_timeout(match)
+    catch_up_timeouts(match)
 
     data = request.get_json() or {}
     bets = data.get("bets", [])
@@ -404,8 +418,7 @@ def insurance(match_id):
     user_num = _get_user_player_num(match)
 
     # Apply any overdue automatic actions BEFORE proceeding
-    while check_timeout(match):
-        apply_timeout(match)
+    catch_up_timeouts(match)
 
     data = request.get_json() or {}
     decisions = data.get("decisions", [])
@@ -422,8 +435,7 @@ def action(match_id):
         user_num = _get_user_player_num(match)
 
         # Apply any overdue automatic actions BEFORE proceeding
-        while check_timeout(match):
-            apply_timeout(match)
+        catch_up_timeouts(match)
 
         # Safely parse JSON
         data = request.get_json(silent=True)
@@ -447,11 +459,8 @@ def action(match_id):
         # Return updated state
         return jsonify(get_client_state(match, user_num))
 
-    except Exception as e:
-        # Log full traceback to Render logs
-        import traceback
-        traceback.print_exc()
-
+    except Exception:
+        log.exception("Player action failed for match_id=%s", match_id)
         return jsonify({"error": "Internal server error"}), 500
 
 
@@ -462,8 +471,7 @@ def dealer_action_route(match_id):
     user_num = _get_user_player_num(match)
 
     # Apply any overdue automatic actions BEFORE proceeding
-    while check_timeout(match):
-        apply_timeout(match)
+    catch_up_timeouts(match)
 
     data = request.get_json() or {}
     action_type = data.get("action")
@@ -483,8 +491,7 @@ def assign_joker(match_id):
     user_num = _get_user_player_num(match)
 
     # Apply any overdue automatic actions BEFORE proceeding
-    while check_timeout(match):
-        apply_timeout(match)
+    catch_up_timeouts(match)
 
     data = request.get_json() or {}
     values = data.get("values", [])
@@ -500,8 +507,7 @@ def assign_dealer_joker(match_id):
     user_num = _get_user_player_num(match)
 
     # Apply any overdue automatic actions BEFORE proceeding
-    while check_timeout(match):
-        apply_timeout(match)
+    catch_up_timeouts(match)
 
     data = request.get_json() or {}
     values = data.get("values", [])
@@ -518,8 +524,7 @@ def next_round(match_id):
     user_num = _get_user_player_num(match)
 
     # Apply any overdue automatic actions BEFORE proceeding
-    while check_timeout(match):
-        apply_timeout(match)
+    catch_up_timeouts(match)
 
     ended = next_round_or_end_turn(match)
 
@@ -535,8 +540,7 @@ def end_turn_route(match_id):
     user_num = _get_user_player_num(match)
 
     # Apply any overdue automatic actions BEFORE proceeding
-    while check_timeout(match):
-        apply_timeout(match)
+    catch_up_timeouts(match)
 
     ended = end_turn(match)
 
@@ -552,9 +556,7 @@ def timeout(match_id):
     user_num = _get_user_player_num(match)
 
     # Apply ALL overdue automatic actions BEFORE proceeding
-    changed = False
-    while check_timeout(match):
-        changed = apply_timeout(match) or changed
+    changed = catch_up_timeouts(match)
 
     payload = get_client_state(match, user_num)
     payload["timeout_applied"] = changed
@@ -570,8 +572,7 @@ def state(match_id):
         return jsonify({"error": "Not part of this match"}), 403
 
     # Apply any overdue automatic actions BEFORE proceeding
-    while check_timeout(match):
-        apply_timeout(match)
+    catch_up_timeouts(match)
 
     player_num = 1 if match.player1_id == current_user.id else 2
     return jsonify(get_client_state(match, player_num))
@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from models import (db, User, AdminConfig, JackpotPool, JackpotEntry,
                      get_jackpot_payouts, get_jackpot_rake_percent)
 from auth import login_required, get_current_user
+from extensions import commit_if_pending
 from sqlalchemy import func
 
 jackpot_bp = Blueprint('jackpot', __name__)
@@ -9,7 +10,7 @@ jackpot_bp = Blueprint('jackpot', __name__)
 
 def get_jackpot_data(pool_type='standard'):
     pool = JackpotPool.get_active_pool(pool_type)
-    db.session.commit()
+    commit_if_pending()
     top_entries = db.session.query(
         JackpotEntry.user_id,
         User.username,
@@ -63,7 +64,7 @@ def leaderboard():
     countdown = get_jackpot_countdown(jackpot_data['pool'])
 
     other_pool = JackpotPool.get_active_pool('joker' if pool_type == 'standard' else 'standard')
-    db.session.commit()
+    commit_if_pending()
 
     user_score = None
     entry = db.session.query(
@@ -89,7 +90,7 @@ def leaderboard():
 @login_required
 def api_jackpots():
     pools = JackpotPool.get_all_active_pools()
-    db.session.commit()
+    commit_if_pending()
     return jsonify({
         'standard': {
             'id': pools['standard'].id,
@@ -0,0 +1,266 @@
+"""
+Progression of expired match decision timers.
+
+`sweep_expired_matches()` applies the default action to every active match
+whose decision timer has run out. It backs the `/internal/cleanup` cron
+endpoint and, on PostgreSQL, a single background listener:
+
+- the listener LISTENs on the `match_timer` channel, which a trigger on
+  `matches` notifies whenever a decision deadline is set;
+- between notifications it sleeps until the earliest pending deadline
+  (capped at LISTEN_MAX_WAIT), so timeouts fire close to on time without
+  any request or cron tick having to poll for them;
+- a session-level advisory lock keeps it to one sweeper across all
+  workers/processes; the others retry the lock periodically and take over
+  if the holder dies.
+
+Other databases (SQLite in local dev) have no LISTEN/NOTIFY, so a poller
+sweeps instead, backing off exponentially from POLL_MIN to POLL_MAX while
+sweeps find nothing and dropping back to POLL_MIN as soon as one does.
+"""
+
+import logging
+import os
+import select
+import threading
+import time
+
+from extensions import db
+from models import Match
+
+log = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "match_timer"
+ADVISORY_LOCK_KEY = 0x6D74696D  # "mtim"
+LISTEN_MAX_WAIT = float(os.environ.get("MATCH_TIMEOUT_MAX_WAIT", "30"))
+LOCK_RETRY_SECONDS = float(os.environ.get("MATCH_TIMEOUT_LOCK_RETRY", "15"))
+LOOP_GUARD = 50
+SWEEP_BATCH = int(os.environ.get("MATCH_SWEEP_BATCH", "50"))
+
+POLL_MIN = float(os.environ.get("MATCH_SWEEP_POLL_MIN", "0.1"))
+POLL_MAX = float(os.environ.get("MATCH_SWEEP_POLL_MAX", "30"))
+BACKOFF = float(os.environ.get("MATCH_SWEEP_BACKOFF", "2.0"))
+
+
+def _claim_expired_match(match_id, now=None):
+    """Lock one expired match for this sweeper, or None if it's taken/handled.
+
+    SKIP LOCKED lets a concurrent sweeper (listener vs. cron) pass over a
+    match that's already being processed; re-checking the timeout under the
+    lock drops matches another sweeper finished since the id scan.
+    """
+    from engine import timed_out_clause
+
+    stmt = (
+        db.select(Match)
+        .where(Match.id == match_id, timed_out_clause(now))
+        .with_for_update(skip_locked=True)
+        .execution_options(populate_existing=True)
+    )
+    return db.session.execute(stmt).scalar_one_or_none()
+
+
+def _lock_match(match_id):
+    """Row-lock a match, waiting for any current holder, and reload it."""
+    stmt = (
+        db.select(Match)
+        .where(Match.id == match_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    return db.session.execute(stmt).scalar_one()
+
+
+def _run_timeouts(match) -> int:
+    """Apply timeouts to a locked match until it stops advancing."""
+    from engine import apply_timeout
+
+    transitions = 0
+    # Keep applying timeouts as long as state advances.
+    # This allows chained transitions (e.g., ROUND_RESULT -> WAITING_BETS).
+    # apply_timeout keeps the row lock until its default action commits;
+    # that commit releases it, so each further step locks the row again.
+    while apply_timeout(match):
+        transitions += 1
+        match = _lock_match(match.id)
+        if transitions > LOOP_GUARD:
+            log.error(
+                "Timeout loop guard hit for match_id=%s phase=%s",
+                getattr(match, "id", None),
+                getattr(getattr(match, "match_state", None), "phase", None),
+            )
+            break
+    # Release the lock the final (no-op) check ran under.
+    db.session.commit()
+    return transitions
+
+
+def sweep_expired_matches() -> int:
+    """Apply timeouts to the longest-expired batch of matches; returns transitions applied.
+
+    A full batch leaves the rest for the next sweep: the listener comes
+    straight back (the next deadline is already past), the poller drops to
+    POLL_MIN, and a cron call stays well inside its HTTP timeout.
+    """
+    from engine import timed_out_clause
+
+    # One clock read for the whole sweep: the id scan and every claim
+    # agree on which matches count as expired.
+    now = time.time()
+
+    # Only consider matches whose decision timer has already run out; the
+    # rest would be no-ops in apply_timeout. SKIP LOCKED leaves out rows a
+    # concurrent sweeper holds right now, so overlapping sweeps take
+    # different batches; each row is still claimed on its own below, since
+    # the first default action's commit releases these locks.
+    expired_ids = db.session.scalars(
+        db.select(Match.id)
+        .where(
+            Match.status_code == Match.MATCH_STATUS["active"],
+            timed_out_clause(now),
+        )
+        .order_by(Match.decision_deadline)
+        .limit(SWEEP_BATCH)
+        .with_for_update(skip_locked=True)
+    ).all()
+
+    transitions = 0
+    for match_id in expired_ids:
+        match = _claim_expired_match(match_id, now)
+        if match is None:
+            db.session.rollback()
+            continue
+        transitions += _run_timeouts(match)
+
+    # Commit once per sweep (avoid extra churn).
+    if transitions:
+        db.session.commit()
+    return transitions
+
+
+def catch_up_timeouts(match, now=None) -> bool:
+    """Apply overdue timeouts to a match a player request is about to use.
+
+    check_timeout() only looks at the loaded row, so requests on matches with
+    a running timer never reach the database here. An expired timer means
+    the request waits for the match's row lock: if the background worker is
+    applying the default action, the request blocks until that action has
+    committed. Everything the request loaded is then reloaded, and the
+    timeout is re-checked under the lock, so the player's action runs on
+    the state the worker left behind (or the request applies the timeout
+    itself) and never alongside the default action.
+    """
+    from engine import check_timeout
+
+    if now is None:
+        now = time.time()
+    if not check_timeout(match, now):
+        return False
+
+    match = _lock_match(match.id)
+    db.session.expire_all()
+    if not check_timeout(match):
+        return False
+    return _run_timeouts(match) > 0
+
+
+def seconds_until_next_deadline() -> float:
+    """How long the listener may sleep before the next pending timer expires."""
+    # Reads the first entry of idx_match_decision_deadline.
+    deadline = db.session.query(db.func.min(Match.decision_deadline)).filter(
+        Match.status_code == Match.MATCH_STATUS["active"],
+        Match.decision_deadline.isnot(None),
+    ).scalar()
+
+    if deadline is None:
+        return LISTEN_MAX_WAIT
+    # check_timeout() uses a strict '>', so wake a hair after the deadline.
+    return min(max(deadline - time.time() + 0.05, 0.0), LISTEN_MAX_WAIT)
+
+
+def _listen_forever(app, dsn):
+    import psycopg2
+    import psycopg2.extensions
+
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(dsn)
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            cur = conn.cursor()
+
+            cur.execute("SELECT pg_try_advisory_lock(%s)", (ADVISORY_LOCK_KEY,))
+            if not cur.fetchone()[0]:
+                conn.close()
+                time.sleep(LOCK_RETRY_SECONDS)
+                continue
+
+            cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            log.info("Match timeout listener active.")
+
+            while True:
+                with app.app_context():
+                    try:
+                        sweep_expired_matches()
+                        wait = seconds_until_next_deadline()
+                    finally:
+                        db.session.remove()
+
+                if select.select([conn], [], [], wait) != ([], [], []):
+                    conn.poll()
+                    conn.notifies.clear()
+        except Exception:
+            log.exception("Match timeout listener failed; restarting.")
+            time.sleep(5)
+        finally:
+            if conn is not None and not conn.closed:
+                conn.close()
+
+
+def _next_poll_interval(interval, transitions):
+    """Back off while sweeps come up empty; go straight back to POLL_MIN after one that doesn't."""
+    if transitions:
+        return POLL_MIN
+    return min(interval * BACKOFF, POLL_MAX)
+
+
+def _poll_forever(app):
+    interval = POLL_MIN
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            try:
+                transitions = sweep_expired_matches()
+            except Exception:
+                db.session.rollback()
+                log.exception("Match timeout sweep failed.")
+                transitions = 0
+            finally:
+                db.session.remove()
+
+        interval = _next_poll_interval(interval, transitions)
+
+
+def start_timeout_worker(app) -> None:
+    """Start the background timeout worker once per app.
+
+    PostgreSQL gets the LISTEN/NOTIFY listener; anything else gets the
+    backoff poller.
+    """
+    if os.environ.get("MATCH_TIMEOUT_LISTENER", "1") != "1":
+        return
+    if app.extensions.get("match_timeout_worker"):
+        return
+
+    with app.app_context():
+        url = db.engine.url
+
+    if url.get_backend_name() == "postgresql":
+        dsn = url.set(drivername="postgresql").render_as_string(hide_password=False)
+        target, args, name = _listen_forever, (app, dsn), "match-timeout-listener"
+    else:
+        target, args, name = _poll_forever, (app,), "match-timeout-poller"
+
+    thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+    app.extensions["match_timeout_worker"] = thread
+    thread.start()
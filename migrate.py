@@ -1,5 +1,9 @@
+import logging
+
 from sqlalchemy import text
-from extensions import db
+from extensions import db, normalize_database_url
+
+log = logging.getLogger(__name__)
 
 
 def run_migrations():
@@ -8,7 +12,7 @@ def run_migrations():
     Can be run multiple times without breaking.
     """
 
-    print("Running database migrations...")
+    log.info("Running database migrations...")
 
     migrations = [
 
@@ -214,29 +218,273 @@ def run_migrations():
         );
         """,
 
+        # ------------------------------------------------------------------
+        # KEYSET PAGINATION INDEXES (account history pages)
+        # ------------------------------------------------------------------
+        """
+        CREATE INDEX IF NOT EXISTS idx_match_p1_history
+        ON matches (player1_id, status, created_at, id);
+        """,
+
+        """
+        CREATE INDEX IF NOT EXISTS idx_match_p2_history
+        ON matches (player2_id, status, created_at, id);
+        """,
+
+        """
+        CREATE INDEX IF NOT EXISTS idx_wallet_tx_user_created
+        ON wallet_transactions (user_id, created_at, id);
+        """,
+
+        # ------------------------------------------------------------------
+        # RAKE LISTINGS: newest-first scans and date-window sums
+        # ------------------------------------------------------------------
+
+        """
+        CREATE INDEX IF NOT EXISTS ix_rake_transactions_created_at
+        ON rake_transactions (created_at);
+        """,
+
+        # ------------------------------------------------------------------
+        # ADD matches.decision_deadline and backfill running timers
+        # (5s / 30s mirror engine.ROUND_RESULT_TIMEOUT / DECISION_TIMEOUT)
+        # ------------------------------------------------------------------
+
+        """
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name='matches' AND column_name='decision_deadline'
+            ) THEN
+                ALTER TABLE matches ADD COLUMN decision_deadline DOUBLE PRECISION;
+
+                UPDATE matches
+                SET decision_deadline = decision_started_at +
+                    CASE WHEN decision_type = 'NEXT' THEN 5 ELSE 30 END
+                WHERE is_waiting_decision AND decision_started_at IS NOT NULL;
+            END IF;
+        END $$;
+        """,
+
+        # ------------------------------------------------------------------
+        # NOTIFY the timeout listener whenever a decision timer is armed
+        # ------------------------------------------------------------------
+
+        """
+        CREATE OR REPLACE FUNCTION notify_match_timer() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('match_timer', NEW.id::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """,
+
+        """
+        DROP TRIGGER IF EXISTS match_timer_armed ON matches;
+        CREATE TRIGGER match_timer_armed
+        AFTER UPDATE OF decision_deadline ON matches
+        FOR EACH ROW
+        WHEN (NEW.decision_deadline IS NOT NULL AND NEW.decision_deadline IS DISTINCT FROM OLD.decision_deadline)
+        EXECUTE PROCEDURE notify_match_timer();
+        """,
+
+        # ------------------------------------------------------------------
+        # MATCH WINNER INDEX + drop player indexes covered by *_history
+        # ------------------------------------------------------------------
+
+        """
+        CREATE INDEX IF NOT EXISTS idx_match_winner_status
+        ON matches (winner_id, status);
+        """,
+
+        """
+        CREATE INDEX IF NOT EXISTS idx_match_active_p1
+        ON matches (player1_id) WHERE status = 1;
+        """,
+
+        """
+        CREATE INDEX IF NOT EXISTS idx_match_active_p2
+        ON matches (player2_id) WHERE status = 1;
+        """,
+
+        """
+        CREATE INDEX IF NOT EXISTS idx_match_decision_deadline
+        ON matches (decision_deadline)
+        WHERE status = 1 AND decision_deadline IS NOT NULL;
+        """,
+
+        """
+        DROP INDEX IF EXISTS idx_match_decision_pending;
+        """,
+
+        """
+        DROP INDEX IF EXISTS idx_match_player1;
+        """,
+
+        """
+        DROP INDEX IF EXISTS idx_match_player2;
+        """,
+
+        # ------------------------------------------------------------------
+        # ADD users.referral_count and backfill it in the same step
+        # ------------------------------------------------------------------
+
+        """
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1
+                FROM information_schema.columns
+                WHERE table_name='users'
+                AND column_name='referral_count'
+            ) THEN
+                ALTER TABLE users
+                ADD COLUMN referral_count INTEGER NOT NULL DEFAULT 0;
+
+                UPDATE users u
+                SET referral_count = r.n
+                FROM (
+                    SELECT referred_by_id, COUNT(*) AS n
+                    FROM users
+                    WHERE referred_by_id IS NOT NULL
+                    GROUP BY referred_by_id
+                ) r
+                WHERE u.id = r.referred_by_id;
+            END IF;
+        END $$;
+        """,
+
+        # ------------------------------------------------------------------
+        # BACKFILL user_stats (one-off, only while the table is empty)
+        # ------------------------------------------------------------------
+
+        """
+        INSERT INTO user_stats (user_id, total_matches, wins, total_wagered, total_won)
+        SELECT p.user_id,
+               COUNT(*),
+               SUM(CASE WHEN m.winner_id = p.user_id THEN 1 ELSE 0 END),
+               COALESCE(SUM(m.stake), 0),
+               COALESCE(SUM(CASE WHEN m.winner_id = p.user_id THEN m.stake ELSE 0 END), 0)
+        FROM matches m
+        JOIN (
+            SELECT id, player1_id AS user_id FROM matches WHERE status = 2
+            UNION ALL
+            SELECT id, player2_id AS user_id FROM matches WHERE status = 2 AND player2_id IS NOT NULL
+        ) p ON p.id = m.id
+        WHERE NOT EXISTS (SELECT 1 FROM user_stats)
+        GROUP BY p.user_id;
+        """,
+
+        # ------------------------------------------------------------------
+        # USERNAME PREFIX SEARCH (admin coins page)
+        # ------------------------------------------------------------------
+
+        """
+        CREATE INDEX IF NOT EXISTS idx_users_username_lower
+        ON users (lower(username) text_pattern_ops);
+        """,
+
+        # ------------------------------------------------------------------
+        # CASE-INSENSITIVE EMAIL LOGIN
+        # ------------------------------------------------------------------
+
+        """
+        CREATE INDEX IF NOT EXISTS idx_users_email_lower
+        ON users (lower(email));
+        """,
+
+        # Registration relies on the unique email constraint, so fold any
+        # mixed-case emails saved before addresses were lowercased (unless
+        # that would collide with an existing lowercase address).
+        """
+        UPDATE users u
+        SET email = lower(u.email)
+        WHERE u.email <> lower(u.email)
+          AND NOT EXISTS (
+              SELECT 1 FROM users o WHERE o.email = lower(u.email)
+          );
+        """,
+
+        # ------------------------------------------------------------------
+        # FOLD per-cell tournament rake / payout keys into single rows
+        # ------------------------------------------------------------------
+
+        """
+        INSERT INTO admin_config (key, value, updated_at)
+        SELECT 'tournament_rake_matrix',
+               json_object_agg(substring(key FROM 17), value::numeric)::text,
+               now()
+        FROM admin_config
+        WHERE key ~ '^tournament_rake_[0-9]+_[0-9]+$'
+        AND NOT EXISTS (SELECT 1 FROM admin_config WHERE key = 'tournament_rake_matrix')
+        HAVING COUNT(*) > 0;
+        """,
+
+        """
+        INSERT INTO admin_config (key, value, updated_at)
+        SELECT 'tournament_payout_matrix',
+               json_object_agg(substring(key FROM 20), value::json)::text,
+               now()
+        FROM admin_config
+        WHERE key ~ '^tournament_payouts_[0-9]+$'
+        AND NOT EXISTS (SELECT 1 FROM admin_config WHERE key = 'tournament_payout_matrix')
+        HAVING COUNT(*) > 0;
+        """,
+
     ]
 
     for migration in migrations:
         try:
             db.session.execute(text(migration))
             db.session.commit()
-            print("✓ Migration applied")
+            log.debug("Migration applied")
         except Exception as e:
             db.session.rollback()
-            print("Migration skipped or failed safely:", e)
+            log.warning("Migration skipped or failed safely: %s", e)
+
+    log.info("Database migrations complete.")
 
-    print("Database migrations complete.")
+
+def promote_admin():
+    """Give the site owner account admin rights (single idempotent UPDATE)."""
+    result = db.session.execute(text(
+        "UPDATE users SET is_admin = TRUE "
+        "WHERE lower(username) = 'iamearth' AND is_admin = FALSE"
+    ))
+    db.session.commit()
+    if result.rowcount:
+        log.info("IAMEARTH promoted to admin.")
+
+
+def init_database():
+    """
+    Create tables, apply migrations and promote the admin account.
+    Run once per deploy (release phase), not in every web worker.
+    """
+    import models  # noqa: F401  registers every table on db.metadata
+
+    db.create_all()
+    run_migrations()
+    promote_admin()
 
 
 if __name__ == "__main__":
+    from dotenv import load_dotenv
     from flask import Flask
     import os
 
+    load_dotenv()
+    logging.basicConfig(level=getattr(logging, os.environ.get("LOG_LEVEL", "INFO").upper(), logging.INFO))
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        raise RuntimeError("DATABASE_URL is not set")
+
     app = Flask(__name__)
-    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL")
+    app.config["SQLALCHEMY_DATABASE_URI"] = normalize_database_url(database_url)
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
     db.init_app(app)
 
     with app.app_context():
-        run_migrations()
+        init_database()
@@ -1,11 +1,21 @@
+from flask import g, has_app_context
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from datetime import datetime, timedelta   # ✅ add timedelta
 import secrets
 import string
 import json                               # ✅ add json
 
-from extensions import db
+from extensions import db, run_blocking
+
+# argon2id at the OWASP baseline (19 MiB, 2 passes). Hashes made by
+# werkzeug's generate_password_hash (pbkdf2/scrypt) still verify and are
+# upgraded on the next successful login.
+password_hasher = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
 
 
 def generate_affiliate_code():
@@ -27,6 +37,9 @@ class User(UserMixin, db.Model):  # 🔥 Added UserMixin
 
     affiliate_code = db.Column(db.String(20), unique=True, nullable=True)
     referred_by_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    # Denormalized count of users whose referred_by_id points here; kept in
+    # step by the User insert/update/delete listeners below.
+    referral_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
 
     is_admin = db.Column(db.Boolean, default=False, nullable=False)
 
@@ -43,10 +56,25 @@ class User(UserMixin, db.Model):  # 🔥 Added UserMixin
     # -------------------------
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = run_blocking(password_hasher.hash, password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        """Verify password; rehashes (caller commits) if the stored hash is outdated."""
+        stored = self.password_hash
+
+        if stored.startswith('$argon2'):
+            try:
+                run_blocking(password_hasher.verify, stored, password)
+            except (VerificationError, InvalidHashError):
+                return False
+            if password_hasher.check_needs_rehash(stored):
+                self.set_password(password)
+            return True
+
+        if not run_blocking(check_password_hash, stored, password):
+            return False
+        self.set_password(password)
+        return True
 
     # -------------------------
     # BUSINESS LOGIC
@@ -82,6 +110,58 @@ class User(UserMixin, db.Model):  # 🔥 Added UserMixin
         return rp
 
 
+def _bump_referral_count(connection, referrer_id, delta):
+    users = User.__table__
+    connection.execute(
+        users.update()
+        .where(users.c.id == referrer_id)
+        .values(referral_count=users.c.referral_count + delta)
+    )
+
+
+@db.event.listens_for(User, 'after_insert')
+def _count_new_referral(mapper, connection, user):
+    if user.referred_by_id:
+        _bump_referral_count(connection, user.referred_by_id, 1)
+
+
+@db.event.listens_for(User, 'after_update')
+def _move_referral(mapper, connection, user):
+    history = db.inspect(user).attrs.referred_by_id.history
+    if not history.has_changes():
+        return
+    for old_id in history.deleted:
+        if old_id:
+            _bump_referral_count(connection, old_id, -1)
+    for new_id in history.added:
+        if new_id:
+            _bump_referral_count(connection, new_id, 1)
+
+
+@db.event.listens_for(User, 'after_delete')
+def _drop_referral(mapper, connection, user):
+    if user.referred_by_id:
+        _bump_referral_count(connection, user.referred_by_id, -1)
+
+
+def credit_coins(amounts):
+    """Add coins to several users with a single UPDATE.
+
+    ``amounts`` maps user id -> coins to add (negative values debit).
+    Issues ``UPDATE users SET coins = coins + CASE id WHEN ... END
+    WHERE id IN (...)`` so the whole batch is one round trip.
+    """
+    amounts = {uid: int(amt) for uid, amt in amounts.items() if amt}
+    if not amounts:
+        return
+    db.session.execute(
+        db.update(User)
+        .where(User.id.in_(list(amounts)))
+        .values(coins=User.coins + db.case(amounts, value=User.id, else_=0))
+        .execution_options(synchronize_session='fetch')
+    )
+
+
 class WalletTransaction(db.Model):
     __tablename__ = 'wallet_transactions'
 
@@ -117,6 +197,10 @@ class WalletTransaction(db.Model):
 
     user = db.relationship('User', backref='wallet_transactions')
 
+    __table_args__ = (
+        db.Index('idx_wallet_tx_user_created', 'user_id', 'created_at', 'id'),
+    )
+
     @property
     def status(self):
         return self.STATUS_LABEL.get(int(self.status_code), 'pending')
@@ -233,6 +317,16 @@ GAME_MODES = {
 GAME_MODE_LIST = list(GAME_MODES.keys())
 
 
+class UserStats(db.Model):
+    """Lifetime match counters, bumped when a match is finalized."""
+    __tablename__ = 'user_stats'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    total_matches = db.Column(db.Integer, default=0, nullable=False)
+    wins = db.Column(db.Integer, default=0, nullable=False)
+    total_wagered = db.Column(db.BigInteger, default=0, nullable=False)
+    total_won = db.Column(db.BigInteger, default=0, nullable=False)
+
+
 class Match(db.Model):
     __tablename__ = 'matches'
 
@@ -273,18 +367,27 @@ class Match(db.Model):
         index=True
     )
 
-    status_code = db.Column(
-        'status',
-        db.SmallInteger,
-        default=MATCH_STATUS['waiting'],
-        nullable=False,
-        index=True
+    # active_history: load the prior status before a write, even once the
+    # row has expired after a commit, so _record_finished_match can tell a
+    # re-save of a finished match from the transition into 'finished'.
+    status_code = db.column_property(
+        db.Column(
+            'status',
+            db.SmallInteger,
+            default=MATCH_STATUS['waiting'],
+            nullable=False,
+            index=True
+        ),
+        active_history=True,
     )
 
     winner_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
 
     decision_started_at = db.Column(db.Float, nullable=True)
     decision_type = db.Column(db.String(20), nullable=True)
+    # Epoch seconds the running decision timer expires at (NULL when idle);
+    # set/cleared together with decision_started_at by the engine helpers.
+    decision_deadline = db.Column(db.Float, nullable=True)
 
     is_waiting_decision = db.Column(db.Boolean, default=False)
     is_spectatable = db.Column(db.Boolean, default=True)
@@ -336,12 +439,72 @@ class Match(db.Model):
     # INDEXES
     # ----------------------------
 
+    # "player1_id = :uid OR player2_id = :uid" filters are planned as a
+    # BitmapOr over the two *_history indexes, e.g.
+    #   Bitmap Index Scan on idx_match_p1_history
+    #     Index Cond: ((player1_id = 42) AND (status = 2))
+    # which also covers what the old single-column player indexes served.
     __table_args__ = (
         db.Index('idx_match_created', 'created_at'),
-        db.Index('idx_match_player1', 'player1_id'),
-        db.Index('idx_match_player2', 'player2_id'),
+        # Keyset pagination of a player's history: (created_at, id) cursor.
+        db.Index('idx_match_p1_history', 'player1_id', 'status', 'created_at', 'id'),
+        db.Index('idx_match_p2_history', 'player2_id', 'status', 'created_at', 'id'),
+        db.Index('idx_match_winner_status', 'winner_id', 'status'),
+        # "My active matches" (lobby): only a handful of rows are active at
+        # any time, so these stay tiny compared to the history indexes.
+        db.Index('idx_match_active_p1', 'player1_id', postgresql_where=db.text('status = 1')),
+        db.Index('idx_match_active_p2', 'player2_id', postgresql_where=db.text('status = 1')),
+        # Timeout sweep: range scan over running timers by deadline.
+        db.Index('idx_match_decision_deadline', 'decision_deadline',
+                 postgresql_where=db.text('status = 1 AND decision_deadline IS NOT NULL')),
     )
 
+_UPSERT_INSERTS = {
+    'postgresql': postgresql_insert,
+    'sqlite': sqlite_insert,
+}
+
+
+@db.event.listens_for(Match, 'after_update')
+def _record_finished_match(mapper, connection, match):
+    """Fold a match into both players' UserStats the moment it finishes."""
+    history = db.inspect(match).attrs.status_code.history
+    finished = Match.MATCH_STATUS['finished']
+    if not history.added or history.added[0] != finished:
+        return
+    if history.deleted and history.deleted[0] == finished:
+        return
+
+    # One atomic upsert per player: two matches finishing at once for a
+    # user with no stats row yet must not both try to INSERT it. Dialects
+    # without ON CONFLICT fall back to UPDATE, then INSERT if no row matched.
+    insert = _UPSERT_INSERTS.get(connection.dialect.name)
+    stats = UserStats.__table__
+    counters = ('total_matches', 'wins', 'total_wagered', 'total_won')
+    stake = int(match.stake or 0)
+    for player_id in (match.player1_id, match.player2_id):
+        if player_id is None:
+            continue
+        won = 1 if match.winner_id == player_id else 0
+        values = dict(total_matches=1, wins=won, total_wagered=stake, total_won=stake * won)
+
+        if insert is None:
+            updated = connection.execute(
+                stats.update()
+                .where(stats.c.user_id == player_id)
+                .values({col: stats.c[col] + values[col] for col in counters})
+            )
+            if updated.rowcount == 0:
+                connection.execute(stats.insert().values(user_id=player_id, **values))
+            continue
+
+        stmt = insert(stats).values(user_id=player_id, **values)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[stats.c.user_id],
+            set_={col: stats.c[col] + stmt.excluded[col] for col in counters},
+        ))
+
+
 class Tournament(db.Model):
     __tablename__ = 'tournaments'
 
@@ -458,7 +621,7 @@ class RakeTransaction(db.Model):
     amount = db.Column(db.Integer, nullable=False)
     stake_amount = db.Column(db.Integer, nullable=True)
     rake_percent = db.Column(db.Float, nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
 
 class AdminConfig(db.Model):
@@ -468,14 +631,32 @@ class AdminConfig(db.Model):
     value = db.Column(db.Text, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    @staticmethod
+    def _request_cache():
+        # Raw JSON strings per key for the current app context (one request),
+        # so repeated lookups cost one SELECT. Values are decoded on every
+        # get, so callers can still mutate what they receive.
+        if not has_app_context():
+            return None
+        if 'admin_config_cache' not in g:
+            g.admin_config_cache = {}
+        return g.admin_config_cache
+
     @staticmethod
     def get(key, default=None):
-        config = AdminConfig.query.filter_by(key=key).first()
-        if config:
+        cache = AdminConfig._request_cache()
+        if cache is not None and key in cache:
+            raw = cache[key]
+        else:
+            config = AdminConfig.query.filter_by(key=key).first()
+            raw = config.value if config else None
+            if cache is not None:
+                cache[key] = raw
+        if raw is not None:
             try:
-                return json.loads(config.value)
+                return json.loads(raw)
             except (json.JSONDecodeError, TypeError):
-                return config.value
+                return raw
         return default
 
     @staticmethod
@@ -489,6 +670,9 @@ class AdminConfig(db.Model):
             config = AdminConfig(key=key, value=val_str)
             db.session.add(config)
         db.session.flush()
+        cache = AdminConfig._request_cache()
+        if cache is not None:
+            cache[key] = val_str
 
 
 class RakebackProgress(db.Model):
@@ -727,21 +911,39 @@ def get_lobby_rake_percent(stake):
     return 1
 
 
-def get_tournament_rake_percent(stake, max_players):
-    key = f'tournament_rake_{stake}_{max_players}'
-    return AdminConfig.get(key, 5)
+DEFAULT_TOURNAMENT_RAKE_PERCENT = 5
 
+DEFAULT_TOURNAMENT_PAYOUTS = {
+    8: {1: 50, 2: 25, 3: 15, 4: 10},
+    16: {1: 45, 2: 25, 3: 15, 4: 10, 5: 5},
+    32: {1: 40, 2: 22, 3: 15, 4: 10, 5: 5, 6: 4, 7: 2, 8: 2},
+    64: {1: 35, 2: 20, 3: 15, 4: 10, 5: 5, 6: 5, 7: 5, 8: 5},
+    128: {1: 30, 2: 18, 3: 13, 4: 10, 5: 7, 6: 7, 7: 5, 8: 5, 9: 5},
+}
 
-def get_tournament_payouts(max_players):
-    key = f'tournament_payouts_{max_players}'
-    default_payouts = {
-        8: {1: 50, 2: 25, 3: 15, 4: 10},
-        16: {1: 45, 2: 25, 3: 15, 4: 10, 5: 5},
-        32: {1: 40, 2: 22, 3: 15, 4: 10, 5: 5, 6: 4, 7: 2, 8: 2},
-        64: {1: 35, 2: 20, 3: 15, 4: 10, 5: 5, 6: 5, 7: 5, 8: 5},
-        128: {1: 30, 2: 18, 3: 13, 4: 10, 5: 7, 6: 7, 7: 5, 8: 5, 9: 5},
-    }
-    result = AdminConfig.get(key, default_payouts.get(max_players, default_payouts[8]))
+
+def get_tournament_rake_matrix():
+    """All tournament rake overrides in one row, keyed '<stake>_<size>'."""
+    return AdminConfig.get('tournament_rake_matrix', {})
+
+
+def get_tournament_payout_matrix():
+    """All tournament payout overrides in one row, keyed by player count."""
+    return AdminConfig.get('tournament_payout_matrix', {})
+
+
+def get_tournament_rake_percent(stake, max_players, matrix=None):
+    if matrix is None:
+        matrix = get_tournament_rake_matrix()
+    return matrix.get(f'{stake}_{max_players}', DEFAULT_TOURNAMENT_RAKE_PERCENT)
+
+
+def get_tournament_payouts(max_players, matrix=None):
+    if matrix is None:
+        matrix = get_tournament_payout_matrix()
+    result = matrix.get(str(max_players))
+    if result is None:
+        result = DEFAULT_TOURNAMENT_PAYOUTS.get(max_players, DEFAULT_TOURNAMENT_PAYOUTS[8])
     if isinstance(result, dict):
         return {int(k): v for k, v in result.items()}
     return result
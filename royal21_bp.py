@@ -36,7 +36,7 @@ def init_socketio(sio):
 @royal21_bp.route('/table/<int:table_id>')
 @login_required
 def table_view(table_id):
-    table = Royal21Table.query.get_or_404(table_id)
+    table = db.get_or_404(Royal21Table, table_id)
     if not table.is_open:
         abort(403)
     my_seat_rec = Royal21Seat.query.filter_by(
@@ -179,7 +179,7 @@ def _broadcast(ts: TableState, extra: dict = None):
 def _refund_player_coins(user_id: int, amount: int):
     """Add `amount` coins back to the user's account and commit."""
     try:
-        user = User.query.get(user_id)
+        user = db.session.get(User, user_id)
         if user and amount > 0:
             user.coins = int(user.coins) + amount
             db.session.commit()
@@ -446,7 +446,7 @@ def _register_socketio_events(sio):
         requested_seat = data.get('seat')  # Optional: specific seat
 
         # Validate table
-        table_rec = Royal21Table.query.get(table_id)
+        table_rec = db.session.get(Royal21Table, table_id)
         if not table_rec or not table_rec.is_open:
             emit('royal21_error', {'message': 'Table not found or closed'})
             return
@@ -635,7 +635,7 @@ def _register_socketio_events(sio):
             emit('royal21_no_seat', {})
             return
 
-        table_rec = Royal21Table.query.get(table_id)
+        table_rec = db.session.get(Royal21Table, table_id)
         if not table_rec:
             emit('royal21_error', {'message': 'Table not found'})
             return
@@ -0,0 +1,60 @@
+"""
+Shared fixtures: the Flask app against a throwaway SQLite file.
+
+The environment has to be set before `app` is imported, since the module
+builds the app (and runs the schema setup) at import time.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_DB_FILE = os.path.join(tempfile.mkdtemp(prefix="flaskwebhub-tests-"), "test.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_FILE}"
+os.environ["RUN_DB_INIT"] = "1"
+os.environ["MATCH_TIMEOUT_LISTENER"] = "0"
+
+# SQLite only auto-increments INTEGER PRIMARY KEY columns, not BIGINT ones.
+from sqlalchemy import BigInteger  # noqa: E402
+from sqlalchemy.ext.compiler import compiles  # noqa: E402
+
+
+@compiles(BigInteger, "sqlite")
+def _sqlite_bigint(type_, compiler, **kw):
+    return "INTEGER"
+
+
+import app as app_module  # noqa: E402
+from extensions import db  # noqa: E402
+from models import User  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    flask_app = app_module.app
+    with flask_app.app_context():
+        yield flask_app
+        db.session.rollback()
+        # SQLite doesn't enforce the foreign keys here, so order is irrelevant.
+        for table in db.metadata.tables.values():
+            db.session.execute(table.delete())
+        db.session.commit()
+        db.session.remove()
+
+
+@pytest.fixture
+def make_user(app):
+    counter = iter(range(1, 10_000))
+
+    def _make_user(**fields):
+        n = next(counter)
+        user = User(username=f"user{n}", email=f"user{n}@example.com", password_hash="x", **fields)
+        db.session.add(user)
+        db.session.commit()
+        return user
+
+    return _make_user
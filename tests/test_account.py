@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from account import _keyset_page
+from extensions import db
+from models import WalletTransaction
+
+
+@pytest.fixture
+def txns(make_user):
+    """Seven transactions over three timestamps, so pages split ties."""
+    user = make_user()
+    base = datetime(2026, 1, 1, 12, 0, 0)
+    stamps = [base] * 3 + [base + timedelta(seconds=1)] * 2 + [base + timedelta(seconds=2)] * 2
+    rows = [
+        WalletTransaction(user_id=user.id, type="deposit", amount=i + 1, created_at=stamp)
+        for i, stamp in enumerate(stamps)
+    ]
+    db.session.add_all(rows)
+    db.session.commit()
+    return user, rows
+
+
+def _page(app, user, per_page, **cursor):
+    with app.test_request_context("/account/transactions", query_string=cursor):
+        rows, next_cursor = _keyset_page(
+            WalletTransaction.query.filter_by(user_id=user.id), WalletTransaction, per_page
+        )
+    return [r.id for r in rows], next_cursor
+
+
+def test_keyset_pages_cover_shared_timestamps_without_gaps(app, txns):
+    user, rows = txns
+    newest_first = [r.id for r in sorted(rows, key=lambda r: (r.created_at, r.id), reverse=True)]
+
+    seen, cursor = [], {}
+    while True:
+        ids, cursor = _page(app, user, 2, **cursor)
+        seen.extend(ids)
+        if cursor is None:
+            break
+
+    assert seen == newest_first
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        {"before": "not-a-date", "before_id": "3"},
+        {"before": "2026-01-01T12:00:01"},
+        {"before_id": "3"},
+        {"before": "2026-01-01T12:00:01", "before_id": "x"},
+    ],
+)
+def test_invalid_or_partial_cursor_falls_back_to_first_page(app, txns, cursor):
+    user, _ = txns
+    assert _page(app, user, 3, **cursor) == _page(app, user, 3)
@@ -0,0 +1,72 @@
+from extensions import db
+from models import AdminConfig, AffiliateCommission, Match
+from affiliate import process_affiliate_commission
+
+
+def _finished_match(player1, player2, rake_amount):
+    match = Match(player1_id=player1.id, player2_id=player2.id, stake=100, rake_amount=rake_amount)
+    match.status = "finished"
+    match.winner_id = player1.id
+    db.session.add(match)
+    db.session.commit()
+    return match
+
+
+def _set_single_tier(percent):
+    AdminConfig.set('affiliate_tiers', [{'name': 'Only', 'threshold': 0, 'percent': percent}])
+    db.session.commit()
+
+
+def test_commission_floors_fractional_tier_on_odd_rake(make_user):
+    _set_single_tier(2.5)
+    referrer = make_user()
+    p1 = make_user(referred_by_id=referrer.id)
+    p2 = make_user(referred_by_id=referrer.id)
+
+    # 1001 rake: each player's half is 500; 2.5% of 500 is 12.5 -> 12.
+    match = _finished_match(p1, p2, rake_amount=1001)
+    process_affiliate_commission(match)
+    db.session.commit()
+
+    rows = AffiliateCommission.query.filter_by(source_match_id=match.id).all()
+    assert sorted(r.amount for r in rows) == [12, 12]
+    assert {r.referred_user_id for r in rows} == {p1.id, p2.id}
+    assert all(r.rate == 0.025 for r in rows)
+
+    db.session.refresh(referrer)
+    assert referrer.coins == sum(r.amount for r in rows) == 24
+
+
+def test_commission_is_paid_once_per_match(make_user):
+    _set_single_tier(5)
+    referrer = make_user()
+    p1 = make_user(referred_by_id=referrer.id)
+    p2 = make_user()
+
+    match = _finished_match(p1, p2, rake_amount=400)
+    process_affiliate_commission(match)
+    db.session.commit()
+    process_affiliate_commission(match)
+    db.session.commit()
+
+    rows = AffiliateCommission.query.filter_by(source_match_id=match.id).all()
+    assert [(r.referrer_id, r.referred_user_id, r.amount) for r in rows] == [(referrer.id, p1.id, 10)]
+
+    db.session.refresh(referrer)
+    assert referrer.coins == 10
+
+
+def test_commission_below_one_coin_is_skipped(make_user):
+    _set_single_tier(2.5)
+    referrer = make_user()
+    p1 = make_user(referred_by_id=referrer.id)
+    p2 = make_user()
+
+    # Half of 37 is 18; 2.5% of 18 floors to 0, so nothing is recorded.
+    match = _finished_match(p1, p2, rake_amount=37)
+    process_affiliate_commission(match)
+    db.session.commit()
+
+    assert AffiliateCommission.query.filter_by(source_match_id=match.id).count() == 0
+    db.session.refresh(referrer)
+    assert referrer.coins == 0
@@ -0,0 +1,61 @@
+import pytest
+
+import engine
+from engine import _secure_shuffle, hand_value
+
+
+def _card(rank, **fields):
+    return dict(rank=rank, suit="hearts", **fields)
+
+
+def _joker(chosen_value=None):
+    if chosen_value is None:
+        return _card("JOKER")
+    return _card("JOKER", chosen_value=chosen_value)
+
+
+@pytest.mark.parametrize(
+    "cards, expected",
+    [
+        ([_card("A"), _card("A")], 12),
+        ([_card("A"), _card("A"), _card("9")], 21),
+        ([_card("A"), _card("5"), _card("K")], 16),
+        ([_card("10"), _card("K")], 20),
+        # A joker played as 11 is a soft ace.
+        ([_joker(11), _card("A")], 12),
+        ([_card("A"), _joker(11)], 12),
+        ([_joker(5), _card("A")], 16),
+        # Unchosen jokers fill up to 21 after the aces have been settled.
+        ([_card("A"), _card("A"), _joker()], 21),
+        ([_card("A"), _card("9"), _joker()], 21),
+        ([_card("A"), _card("K"), _joker()], 12),
+        ([_card("A"), _joker(), _joker()], 12),
+        ([_joker(), _joker()], 21),
+    ],
+)
+def test_hand_value(cards, expected):
+    assert hand_value(cards) == expected
+
+
+@pytest.mark.parametrize("size", [0, 1, 52, 54])
+def test_secure_shuffle_is_a_permutation(size):
+    items = list(range(size))
+    _secure_shuffle(items)
+    assert sorted(items) == list(range(size))
+
+
+def test_rejected_draws_retry_to_every_index(monkeypatch):
+    # All-zero words are below 2**32 % n for any n that isn't a power of
+    # two, so the last step of a 6-item shuffle always takes the retry.
+    monkeypatch.setattr(engine.secrets, "token_bytes", lambda count: bytes(count))
+    n = 6
+    for j in range(n):
+        # Smallest 32-bit draw whose high word of draw * n is j, plus one so
+        # the low word clears the rejection threshold.
+        draw = -(-(j << 32) // n) + 1
+        monkeypatch.setattr(engine._sysrand, "getrandbits", lambda bits, draw=draw: draw)
+
+        items = list(range(n))
+        _secure_shuffle(items)
+        assert items[-1] == j
+        assert sorted(items) == list(range(n))
@@ -0,0 +1,83 @@
+import time
+
+from sqlalchemy.orm.attributes import set_committed_value
+
+import match_timeouts
+from engine import _get_match_state, init_game_state
+from extensions import db
+from match_timeouts import catch_up_timeouts, sweep_expired_matches
+from models import Match
+
+
+def _match_in_choice(make_user, status="active", expired_for=None):
+    """An active match waiting on the CHOICE decision; expired_for backdates its timer."""
+    match = Match(player1_id=make_user().id, player2_id=make_user().id, stake=10)
+    match.status = status
+    db.session.add(match)
+    db.session.commit()
+    init_game_state(match)
+    if expired_for is not None:
+        match.decision_deadline = time.time() - expired_for
+        db.session.commit()
+    return match
+
+
+def _phase(match):
+    db.session.expire_all()
+    return _get_match_state(match.id).phase
+
+
+def test_sweep_takes_expired_active_matches_oldest_first_in_batches(make_user, monkeypatch):
+    monkeypatch.setattr(match_timeouts, "SWEEP_BATCH", 2)
+    oldest = _match_in_choice(make_user, expired_for=30)
+    older = _match_in_choice(make_user, expired_for=20)
+    old = _match_in_choice(make_user, expired_for=10)
+    running = _match_in_choice(make_user)
+    finished = _match_in_choice(make_user, status="finished", expired_for=40)
+
+    # A CHOICE timeout is one transition: a random pick, then WAITING_BETS
+    # with a fresh BET timer.
+    assert sweep_expired_matches() == 2
+    assert [_phase(m) for m in (oldest, older, old)] == ["WAITING_BETS", "WAITING_BETS", "CHOICE"]
+
+    assert sweep_expired_matches() == 1
+    assert _phase(old) == "WAITING_BETS"
+
+    assert sweep_expired_matches() == 0
+    assert _phase(running) == "CHOICE"
+    assert _phase(finished) == "CHOICE"
+
+
+def test_catch_up_leaves_a_running_timer_alone(make_user):
+    match = _match_in_choice(make_user)
+    deadline = match.decision_deadline
+
+    assert catch_up_timeouts(match) is False
+    assert _phase(match) == "CHOICE"
+    assert match.decision_deadline == deadline
+
+
+def test_catch_up_does_not_reapply_a_timer_cleared_meanwhile(make_user):
+    match = _match_in_choice(make_user, expired_for=5)
+    assert catch_up_timeouts(match) is True
+    assert _phase(match) == "WAITING_BETS"
+
+    # A request that loaded the match before the worker handled it still
+    # sees the expired CHOICE timer in memory.
+    set_committed_value(match, "decision_type", "CHOICE")
+    set_committed_value(match, "decision_deadline", time.time() - 5)
+    set_committed_value(match, "is_waiting_decision", True)
+
+    assert catch_up_timeouts(match) is False
+    assert _phase(match) == "WAITING_BETS"
+    assert match.decision_type == "BET"
+
+
+def test_poll_interval_backs_off_then_resets_after_work():
+    interval = match_timeouts.POLL_MIN
+    for _ in range(3):
+        interval = match_timeouts._next_poll_interval(interval, 0)
+    assert interval == match_timeouts.POLL_MIN * match_timeouts.BACKOFF ** 3
+
+    assert match_timeouts._next_poll_interval(interval, 1) == match_timeouts.POLL_MIN
+    assert match_timeouts._next_poll_interval(match_timeouts.POLL_MAX, 0) == match_timeouts.POLL_MAX
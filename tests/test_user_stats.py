@@ -0,0 +1,61 @@
+from extensions import db
+from models import Match, UserStats
+
+
+def _active_match(player1, player2, stake=50):
+    match = Match(player1_id=player1.id, player2_id=player2.id, stake=stake)
+    match.status = "active"
+    db.session.add(match)
+    db.session.commit()
+    return match
+
+
+def _stats(user):
+    row = db.session.get(UserStats, user.id, populate_existing=True)
+    return (row.total_matches, row.wins, row.total_wagered, row.total_won)
+
+
+def test_forfeit_counts_the_match_once_for_both_players(app, make_user):
+    quitter, opponent = make_user(), make_user()
+    match = _active_match(quitter, opponent)
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(quitter.id)
+        sess["_fresh"] = True
+    response = client.post(f"/game/forfeit_match/{match.id}")
+    assert response.status_code == 302
+
+    assert _stats(quitter) == (1, 0, 50, 0)
+    assert _stats(opponent) == (1, 1, 50, 50)
+
+
+def test_resaving_a_finished_match_does_not_count_it_again(make_user):
+    winner, loser = make_user(), make_user()
+    match = _active_match(winner, loser)
+    match.winner_id = winner.id
+    match.status = "finished"
+    db.session.commit()
+
+    match.rake_amount = 4
+    db.session.commit()
+    match.status = "completed"  # alias of finished
+    db.session.commit()
+
+    assert _stats(winner) == (1, 1, 50, 50)
+    assert _stats(loser) == (1, 0, 50, 0)
+
+
+def test_stats_accumulate_without_on_conflict_support(make_user, monkeypatch):
+    import models
+
+    monkeypatch.setattr(models, "_UPSERT_INSERTS", {})
+    winner, loser = make_user(), make_user()
+    for stake in (50, 30):
+        match = _active_match(winner, loser, stake=stake)
+        match.winner_id = winner.id
+        match.status = "finished"
+        db.session.commit()
+
+    assert _stats(winner) == (2, 2, 80, 80)
+    assert _stats(loser) == (2, 0, 80, 0)
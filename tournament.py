@@ -7,6 +7,7 @@ from extensions import db
 from models import (
     User, Match, Tournament, TournamentEntry, TournamentMatch,
     RakeTransaction, get_tournament_rake_percent, get_tournament_payouts,
+    get_tournament_rake_matrix, get_tournament_payout_matrix,
     GAME_MODES, GAME_MODE_LIST
 )
 
@@ -143,43 +144,70 @@ def tournaments_page():
     if game_mode not in GAME_MODE_LIST:
         game_mode = 'classic'
 
-    my_entries = TournamentEntry.query.filter_by(user_id=user.id).all()
-    my_tournament_ids = {e.tournament_id for e in my_entries}
+    # One grouped query for every waiting lobby (id + entry count) and one
+    # windowed query for the two newest active tournaments per cell, instead
+    # of three queries for each of the 25 stake/size cells. Only the columns
+    # the page shows are selected; no Tournament/Entry objects are built.
+    waiting_by_cell = {}
+    for row in db.session.execute(
+        db.select(
+            Tournament.id, Tournament.stake_amount, Tournament.max_players,
+            db.func.count(TournamentEntry.id).label('entry_count'),
+        )
+        .outerjoin(TournamentEntry, TournamentEntry.tournament_id == Tournament.id)
+        .where(Tournament.game_mode == game_mode, Tournament.status == 'waiting')
+        .group_by(Tournament.id)
+        .order_by(Tournament.id)
+    ):
+        waiting_by_cell.setdefault((row.stake_amount, row.max_players), row)
+
+    newest = db.select(
+        Tournament.id, Tournament.stake_amount, Tournament.max_players,
+        db.func.row_number().over(
+            partition_by=(Tournament.stake_amount, Tournament.max_players),
+            order_by=Tournament.started_at.desc(),
+        ).label('rn'),
+    ).where(
+        Tournament.game_mode == game_mode, Tournament.status == 'active'
+    ).subquery()
+    active_by_cell = {}
+    for row in db.session.execute(
+        db.select(newest.c.id, newest.c.stake_amount, newest.c.max_players)
+        .where(newest.c.rn <= 2)
+        .order_by(newest.c.rn)
+    ):
+        active_by_cell.setdefault((row.stake_amount, row.max_players), []).append(row)
+
+    my_tournament_ids = set(db.session.scalars(
+        db.select(TournamentEntry.tournament_id).where(
+            TournamentEntry.user_id == user.id,
+            TournamentEntry.tournament_id.in_([w.id for w in waiting_by_cell.values()]),
+        )
+    ))
 
     tournament_data = []
+    rake_matrix = get_tournament_rake_matrix()
+    payout_matrix = get_tournament_payout_matrix()
 
     for stake in Tournament.STAKES:
         stake_variants = []
 
         for size in Tournament.PLAYER_SIZES:
-
-            waiting = Tournament.query.filter(
-                Tournament.stake_amount == stake,
-                Tournament.max_players == size,
-                Tournament.game_mode == game_mode,
-                Tournament.status == 'waiting'
-            ).first()
+            waiting = waiting_by_cell.get((stake, size))
 
             entry_count = 0
             user_joined = False
             waiting_id = None
 
             if waiting:
-                entry_count = TournamentEntry.query.filter_by(
-                    tournament_id=waiting.id
-                ).count()
+                entry_count = waiting.entry_count
                 user_joined = waiting.id in my_tournament_ids
                 waiting_id = waiting.id
 
-            active_list = Tournament.query.filter(
-                Tournament.stake_amount == stake,
-                Tournament.max_players == size,
-                Tournament.game_mode == game_mode,
-                Tournament.status == 'active'
-            ).order_by(Tournament.started_at.desc()).limit(2).all()
+            active_list = active_by_cell.get((stake, size), [])
 
-            rake_pct = float(get_tournament_rake_percent(stake, size))
-            payouts = get_tournament_payouts(size)
+            rake_pct = float(get_tournament_rake_percent(stake, size, rake_matrix))
+            payouts = get_tournament_payouts(size, payout_matrix)
 
             total_entry = stake * size
             rake = int(total_entry * rake_pct / 100)